@@ -1,13 +1,108 @@
+import importlib
 import os
-from flask import Flask, request
-from dotenv import load_dotenv
-from flask_jwt_extended import decode_token
+import sys
+import threading
 from .config import Config
-from .extensions import db, migrate, jwt
-from .bootstrap import ensure_default_admin
 
-def create_app():
-    
+# Only the standard library and Config at module level: `import app` (run.py,
+# worker.py, asgi.py, bench scripts) should not pay for Flask, SQLAlchemy and
+# the models until create_app() actually builds something.
+
+# name -> (module, blueprint attribute, url_prefix)
+BLUEPRINTS = {
+    "auth": (".auth.routes", "auth_bp", None),
+    "admin": (".admin.routes", "admin_bp", "/admin"),
+    "user": (".user.routes", "user_bp", "/user"),
+    "api": (".api.routes", "api_bp", "/api/v1"),
+}
+
+
+def _register_blueprints(app, names):
+    for name in names:
+        module_name, attr, url_prefix = BLUEPRINTS[name]
+        module = importlib.import_module(module_name, __name__)
+        app.register_blueprint(getattr(module, attr), url_prefix=url_prefix)
+
+
+class _LazyBlueprints:
+    """
+    Imports and registers the blueprints on the first request instead of in
+    create_app(), so processes that never serve a request skip those imports.
+    Registration has to happen before Flask handles its first request, hence
+    a WSGI wrapper rather than a before_request hook.
+    """
+
+    def __init__(self, app, names):
+        self.app = app
+        self.names = names
+        self.wsgi_app = app.wsgi_app
+        self._lock = threading.Lock()
+        self._done = False
+
+    def __call__(self, environ, start_response):
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    _register_blueprints(self.app, self.names)
+                    self._done = True
+        return self.wsgi_app(environ, start_response)
+
+
+# `flask` global options that take a value; the subcommand comes after them
+_CLI_VALUE_OPTIONS = ("--app", "-A", "--env-file", "-e")
+
+
+def _flask_cli_args():
+    """argv after the program name when running under the `flask` CLI, else None."""
+    if not sys.argv:
+        return None
+    prog = os.path.abspath(sys.argv[0])
+    name = os.path.basename(prog)
+    if name == "__main__.py":
+        # `python -m flask`, not any other `python -m <pkg>`
+        if os.path.basename(os.path.dirname(prog)) != "flask":
+            return None
+    elif name not in ("flask", "flask.exe"):
+        return None
+    return sys.argv[1:]
+
+
+def _flask_command():
+    """The subcommand name given to the `flask` CLI (after its global options), else None."""
+    args = iter(_flask_cli_args() or ())
+    for arg in args:
+        if arg in _CLI_VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _wants_migrate(app) -> bool:
+    # Flask-Migrate pulls in all of Alembic; only `flask db ...` needs it
+    if app.config["LOAD_MIGRATE"]:
+        return True
+    return _flask_command() == "db"
+
+
+def create_app(blueprints=None, lazy_blueprints=None):
+    """
+    blueprints: names from BLUEPRINTS to register (default APP_BLUEPRINTS);
+    pass () for worker/CLI processes that serve no pages.
+    lazy_blueprints: defer their import to the first request (default
+    APP_LAZY_BLUEPRINTS).
+    """
+    from dotenv import load_dotenv
+    from flask import Flask
+    from .extensions import (
+        db, jwt, perm_cache, token_cache, fragment_cache, password_hasher, limiter,
+        replica_router, request_metrics,
+    )
+    from .change_log import init_change_log
+    from .storage import init_storage
+    from .db_pool import engine_options, prewarm
+    from .db_routing import replica_binds
+
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     env_path = os.path.join(base_dir, ".env")
     load_dotenv(env_path)
@@ -19,26 +114,66 @@ def create_app():
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "change-me")
 
     app.config["UPLOAD_FOLDER"] = os.path.join(base_dir, "app", "uploads")
+    app.config["MIGRATIONS_DIR"] = os.path.join(base_dir, "migrations")
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
     if not app.config["SQLALCHEMY_DATABASE_URI"]:
         raise RuntimeError(f"DATABASE_URL is missing in {env_path}")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+        app.config, app.config["SQLALCHEMY_DATABASE_URI"]
+    )
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(
+        app.config, app.config["DATABASE_REPLICA_URLS"], engine_options
+    )
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    replica_router.init_app(app)
+    request_metrics.init_app(app)
+    if _wants_migrate(app):
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=app.config["MIGRATIONS_DIR"])
     jwt.init_app(app)
-    with app.app_context():
-        ensure_default_admin()
+    perm_cache.init_app(app)
+    token_cache.init_app(app)
+    fragment_cache.init_app(app)
+    password_hasher.init_app(app)
+    limiter.init_app(app)
+    init_storage(app)
+    init_change_log(app)
+    if _flask_cli_args() is not None:
+        # CLI-only commands; text_index drags in the models, zipfile and a
+        # process pool that serving processes import on demand instead
+        from .bootstrap import init_bootstrap
+        from .text_index import init_text_index
+        init_bootstrap(app)
+        init_text_index(app)
+    if app.config["BOOTSTRAP_ON_STARTUP"]:
+        from .bootstrap import ensure_default_admin
+        # dev convenience; in production run `flask bootstrap` once per deploy
+        with app.app_context():
+            try:
+                ensure_default_admin(wait=False)
+            except Exception:
+                app.logger.warning("default admin bootstrap failed", exc_info=True)
+
+    if app.config["DB_POOL_PREWARM"]:
+        # on the first request rather than in create_app(), so CLI and worker
+        # processes never open connections for it; in the background so that
+        # request does not wait on the extra connects
+        prewarm_once = threading.Lock()
+
+        @app.before_request
+        def prewarm_pool():
+            if prewarm_once.acquire(blocking=False):
+                threading.Thread(
+                    target=prewarm, args=(db.engine, app.config["DB_POOL_PREWARM"]), daemon=True
+                ).start()
 
     @app.context_processor
     def inject_csrf_token():
-        token = request.cookies.get("access_token_cookie")
-        if not token:
-            return {"jwt_csrf": None}
-        try:
-            return {"jwt_csrf": decode_token(token).get("csrf")}
-        except Exception:
-            return {"jwt_csrf": None}
+        # reuses the claims the guard already verified for this request
+        from .auth.tokens import request_csrf_token
+        return {"jwt_csrf": request_csrf_token()}
         
     @app.context_processor
     def inject_default_admin():
@@ -47,12 +182,31 @@ def create_app():
         }
 
 
-    from .auth.routes import auth_bp
-    from .admin.routes import admin_bp
-    from .user.routes import user_bp
+    @app.get("/healthz")
+    def healthz():
+        # process liveness only: no DB, no auth, no blueprint imports
+        return {"status": "ok"}
+
+    if blueprints is None:
+        blueprints = [b.strip() for b in app.config["APP_BLUEPRINTS"].split(",") if b.strip()]
+    if lazy_blueprints is None:
+        lazy_blueprints = app.config["APP_LAZY_BLUEPRINTS"]
+    if lazy_blueprints:
+        app.wsgi_app = _LazyBlueprints(app, list(blueprints))
+    else:
+        _register_blueprints(app, blueprints)
+
+    if app.config["FILE_DELIVERY_EMULATE"] and app.config["FILE_DELIVERY_MODE"] != "app":
+        from .accel import AccelRedirectMiddleware
+        app.wsgi_app = AccelRedirectMiddleware(
+            app.wsgi_app, app.config["UPLOAD_FOLDER"], app.config["X_ACCEL_PREFIX"]
+        )
 
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(admin_bp, url_prefix="/admin")
-    app.register_blueprint(user_bp, url_prefix="/user")
+    if app.config["TRUSTED_PROXIES"]:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        # outermost, so everything above sees the client's address and scheme
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"], x_proto=app.config["TRUSTED_PROXIES"]
+        )
 
     return app
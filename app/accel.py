@@ -0,0 +1,56 @@
+import os
+from werkzeug.utils import send_file
+
+
+class AccelRedirectMiddleware:
+    """
+    Local stand-in for nginx/Apache: when the app answers with X-Accel-Redirect
+    or X-Sendfile, serve that file here instead, the way the proxy would
+    (including Range/conditional handling). For development and tests only.
+    """
+
+    def __init__(self, wsgi_app, upload_folder: str, accel_prefix: str):
+        self.wsgi_app = wsgi_app
+        self.upload_folder = os.path.abspath(upload_folder)
+        self.accel_prefix = "/" + accel_prefix.strip("/") + "/"
+
+    def __call__(self, environ, start_response):
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            return lambda data: None
+
+        app_iter = self.wsgi_app(environ, capture)
+        headers = dict(captured.get("headers", []))
+        path = self._resolve(headers)
+        if path is None:
+            start_response(captured["status"], captured["headers"])
+            return app_iter
+
+        if hasattr(app_iter, "close"):
+            app_iter.close()
+
+        if not os.path.isfile(path):
+            start_response("404 NOT FOUND", [("Content-Type", "text/plain")])
+            return [b"Not Found"]
+
+        etag = headers.get("ETag", "").strip('"') or True
+        response = send_file(
+            path, environ, mimetype=headers.get("Content-Type"), conditional=True, etag=etag,
+        )
+        for name in ("Content-Disposition", "Cache-Control", "Last-Modified"):
+            if name in headers:
+                response.headers[name] = headers[name]
+        return response(environ, start_response)
+
+    def _resolve(self, headers: dict):
+        accel = headers.get("X-Accel-Redirect")
+        if accel:
+            if not accel.startswith(self.accel_prefix):
+                return None
+            rel = accel[len(self.accel_prefix):]
+            path = os.path.abspath(os.path.join(self.upload_folder, *rel.split("/")))
+            return path if path.startswith(self.upload_folder + os.sep) else None
+        return headers.get("X-Sendfile")
@@ -0,0 +1,228 @@
+import csv
+import io
+from collections import Counter
+from sqlalchemy import tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .extensions import db, perm_cache
+from .models import Document, ProjectAccess, User
+from .effective_access import recompute_pairs
+from .change_log import record as record_change
+
+ACTIONS = ("grant", "update", "revoke")
+
+# rows per statement; keeps bind parameters well under the driver limit
+BATCH = 1000
+
+
+class BulkAccessError(ValueError):
+    pass
+
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on", "y")
+    return bool(value)
+
+
+def _row(action, project_id, user_id, can_edit=False, can_delete=False) -> dict:
+    action = (action or "").strip().lower()
+    if action not in ACTIONS:
+        raise BulkAccessError(f"unknown action {action!r}")
+    try:
+        project_id, user_id = int(project_id), int(user_id)
+    except (TypeError, ValueError):
+        raise BulkAccessError("project_id and user_id must be integers")
+    return {
+        "action": action,
+        "project_id": project_id,
+        "user_id": user_id,
+        "can_edit": _flag(can_edit),
+        "can_delete": _flag(can_delete),
+    }
+
+
+def parse_json(data) -> list:
+    """
+    Accepts a list of rows, or {"rows": [...], "matrix": [...]} where each
+    matrix entry expands to every (project_id, user_id) pair:
+        {"action": "grant", "project_ids": [1, 2], "user_ids": [7, 8], "can_edit": true}
+    """
+    if isinstance(data, list):
+        data = {"rows": data}
+    if not isinstance(data, dict):
+        raise BulkAccessError("expected a JSON object or list")
+
+    rows = []
+    for item in data.get("rows") or []:
+        rows.append(_row(
+            item.get("action"), item.get("project_id"), item.get("user_id"),
+            item.get("can_edit"), item.get("can_delete"),
+        ))
+    for item in data.get("matrix") or []:
+        for project_id in item.get("project_ids") or []:
+            for user_id in item.get("user_ids") or []:
+                rows.append(_row(
+                    item.get("action"), project_id, user_id,
+                    item.get("can_edit"), item.get("can_delete"),
+                ))
+    return rows
+
+
+def parse_csv(text: str) -> list:
+    """Header row required: action,project_id,user_id[,can_edit,can_delete]"""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"action", "project_id", "user_id"} - set(reader.fieldnames or [])
+    if missing:
+        raise BulkAccessError(f"missing CSV columns: {', '.join(sorted(missing))}")
+    return [
+        _row(r.get("action"), r.get("project_id"), r.get("user_id"),
+             r.get("can_edit"), r.get("can_delete"))
+        for r in reader
+    ]
+
+
+def apply_bulk_access(rows: list, commit: bool = True) -> dict:
+    """
+    Apply grant/update/revoke rows in one transaction.
+
+    grant  -> INSERT ... ON CONFLICT (uq_project_user_access) DO UPDATE
+    update -> same upsert, but only for pairs that already exist
+    revoke -> batched DELETE
+    The last row for a given (project, user) pair wins; earlier ones are
+    reported as "superseded". Returns {"results": [...], "summary": {...}}.
+    """
+    results = [dict(index=i, **{k: r[k] for k in ("action", "project_id", "user_id")})
+               for i, r in enumerate(rows)]
+
+    latest = {}
+    for i, r in enumerate(rows):
+        pair = (r["project_id"], r["user_id"])
+        if pair in latest:
+            results[latest[pair]]["status"] = "superseded"
+        latest[pair] = i
+
+    project_ids = {p for p, _ in latest}
+    user_ids = {u for _, u in latest}
+    known_projects = _existing(Document.id, project_ids)
+    known_users = _existing(User.id, user_ids, User.role == "user", User.is_active.is_(True))
+
+    upserts, revokes, updates = {}, [], []
+    for pair, i in latest.items():
+        r = rows[i]
+        if pair[0] not in known_projects:
+            results[i]["status"] = "unknown_project"
+        elif pair[1] not in known_users:
+            results[i]["status"] = "unknown_user"
+        elif r["action"] == "revoke":
+            revokes.append(pair)
+        else:
+            if r["action"] == "update":
+                updates.append(pair)
+            upserts[pair] = i
+
+    # "update" must not create access: drop pairs that don't exist yet
+    existing_updates = _existing_pairs(updates)
+    for pair in updates:
+        if pair not in existing_updates:
+            results[upserts.pop(pair)]["status"] = "not_found"
+
+    for pair, status in _upsert(rows, upserts).items():
+        results[upserts[pair]]["status"] = status
+        r = rows[upserts[pair]]
+        # Core writes skip the ORM flush hooks that feed the change log
+        record_change("access", pair, "create" if status == "granted" else "update", {
+            "project_id": pair[0],
+            "user_id": pair[1],
+            "can_read": True,
+            "can_edit": r["can_edit"],
+            "can_delete": r["can_delete"],
+        })
+
+    removed = _delete(revokes)
+    for pair in revokes:
+        results[latest[pair]]["status"] = "revoked" if pair in removed else "not_found"
+    for pair in removed:
+        record_change("access", pair, "delete")
+
+    recompute_pairs(set(upserts) | removed)
+
+    if commit:
+        db.session.commit()
+        # this process now; the others (or all of them, when run as a job) via the change log
+        touched = {u for (_, u) in upserts} | {u for (_, u) in removed}
+        perm_cache.bump_user(*touched)
+
+    return {
+        "results": results,
+        "summary": dict(Counter(r["status"] for r in results)),
+    }
+
+
+def _existing(column, ids, *criteria) -> set:
+    found = set()
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH):
+        chunk = ids[start:start + BATCH]
+        found.update(
+            v for (v,) in db.session.query(column).filter(column.in_(chunk), *criteria)
+        )
+    return found
+
+
+def _existing_pairs(pairs) -> set:
+    found = set()
+    for start in range(0, len(pairs), BATCH):
+        chunk = pairs[start:start + BATCH]
+        found.update(
+            db.session.query(ProjectAccess.project_id, ProjectAccess.user_id)
+            .filter(tuple_(ProjectAccess.project_id, ProjectAccess.user_id).in_(chunk))
+            .all()
+        )
+    return found
+
+
+def _upsert(rows, upserts: dict) -> dict:
+    statuses = {}
+    items = list(upserts.items())
+    for start in range(0, len(items), BATCH):
+        values = [
+            {
+                "project_id": pair[0],
+                "user_id": pair[1],
+                "can_read": True,  # grant implies read, same as the form routes
+                "can_edit": rows[i]["can_edit"],
+                "can_delete": rows[i]["can_delete"],
+            }
+            for pair, i in items[start:start + BATCH]
+        ]
+        stmt = pg_insert(ProjectAccess).values(values)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_project_user_access",
+            set_={
+                "can_read": True,
+                "can_edit": stmt.excluded.can_edit,
+                "can_delete": stmt.excluded.can_delete,
+            },
+        ).returning(
+            ProjectAccess.project_id,
+            ProjectAccess.user_id,
+            # xmax is 0 only for freshly inserted tuples
+            literal_column("(xmax = 0)").label("inserted"),
+        )
+        for project_id, user_id, inserted in db.session.execute(stmt):
+            statuses[(project_id, user_id)] = "granted" if inserted else "updated"
+    return statuses
+
+
+def _delete(pairs) -> set:
+    removed = set()
+    for start in range(0, len(pairs), BATCH):
+        chunk = pairs[start:start + BATCH]
+        stmt = (
+            db.delete(ProjectAccess)
+            .where(tuple_(ProjectAccess.project_id, ProjectAccess.user_id).in_(chunk))
+            .returning(ProjectAccess.project_id, ProjectAccess.user_id)
+        )
+        removed.update(tuple(r) for r in db.session.execute(stmt))
+    return removed
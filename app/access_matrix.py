@@ -0,0 +1,133 @@
+from .extensions import db
+from .models import ProjectAccess
+
+PERMS = ("read", "edit", "delete")
+
+
+class AccessMatrix:
+    """
+    Read/edit/delete grants packed into int bitsets.
+
+    Users and projects get dense ordinals (0..n) in the order they are first
+    seen. Per project we keep one bitset per permission over user ordinals, and
+    per user one read bitset over project ordinals, so both "who can access P"
+    and "what can U access" are a single bitset walk. No ORM rows are kept.
+    """
+
+    def __init__(self):
+        self._user_ord = {}
+        self._user_ids = []
+        self._project_ord = {}
+        self._project_ids = []
+        # project ordinal -> [read_bits, edit_bits, delete_bits] over user ordinals
+        self._by_project = []
+        # user ordinal -> read bits over project ordinals
+        self._by_user = []
+
+    @classmethod
+    def load(cls, project_ids=None, batch_size: int = 5000):
+        """
+        Build from project_access. project_ids limits it to e.g. the current page;
+        None loads every grant (streamed in batches, tuples only).
+        """
+        matrix = cls()
+        if project_ids is not None:
+            for pid in project_ids:
+                matrix._project(pid)
+            if not project_ids:
+                return matrix
+
+        query = db.session.query(
+            ProjectAccess.project_id,
+            ProjectAccess.user_id,
+            ProjectAccess.can_read,
+            ProjectAccess.can_edit,
+            ProjectAccess.can_delete,
+        )
+        if project_ids is not None:
+            query = query.filter(ProjectAccess.project_id.in_(project_ids))
+
+        for project_id, user_id, can_read, can_edit, can_delete in query.yield_per(batch_size):
+            matrix.add(project_id, user_id, can_read, can_edit, can_delete)
+        return matrix
+
+    def _user(self, user_id: int) -> int:
+        ordinal = self._user_ord.get(user_id)
+        if ordinal is None:
+            ordinal = self._user_ord[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._by_user.append(0)
+        return ordinal
+
+    def _project(self, project_id: int) -> int:
+        ordinal = self._project_ord.get(project_id)
+        if ordinal is None:
+            ordinal = self._project_ord[project_id] = len(self._project_ids)
+            self._project_ids.append(project_id)
+            self._by_project.append([0, 0, 0])
+        return ordinal
+
+    def add(self, project_id, user_id, can_read=True, can_edit=False, can_delete=False):
+        p = self._project(project_id)
+        u = self._user(user_id)
+        bits = self._by_project[p]
+        # same rule as the routes: any grant implies read
+        flags = (can_read or can_edit or can_delete, can_edit, can_delete)
+        for i, flag in enumerate(flags):
+            if flag:
+                bits[i] |= 1 << u
+            else:
+                bits[i] &= ~(1 << u)
+        if flags[0]:
+            self._by_user[u] |= 1 << p
+        else:
+            self._by_user[u] &= ~(1 << p)
+
+    def remove(self, project_id, user_id):
+        p = self._project_ord.get(project_id)
+        u = self._user_ord.get(user_id)
+        if p is None or u is None:
+            return
+        bits = self._by_project[p]
+        for i in range(len(bits)):
+            bits[i] &= ~(1 << u)
+        self._by_user[u] &= ~(1 << p)
+
+    def has(self, project_id, user_id, perm: str = "read") -> bool:
+        p = self._project_ord.get(project_id)
+        u = self._user_ord.get(user_id)
+        if p is None or u is None:
+            return False
+        return bool(self._by_project[p][PERMS.index(perm)] >> u & 1)
+
+    def users_for(self, project_id, perm: str = "read"):
+        """User ids holding perm on project_id, in ordinal order."""
+        p = self._project_ord.get(project_id)
+        if p is None:
+            return []
+        return [self._user_ids[u] for u in _iter_bits(self._by_project[p][PERMS.index(perm)])]
+
+    def projects_for(self, user_id):
+        """Project ids user_id can read, in ordinal order."""
+        u = self._user_ord.get(user_id)
+        if u is None:
+            return []
+        return [self._project_ids[p] for p in _iter_bits(self._by_user[u])]
+
+    def grant_count(self, project_id, perm: str = "read") -> int:
+        p = self._project_ord.get(project_id)
+        if p is None:
+            return 0
+        return self._by_project[p][PERMS.index(perm)].bit_count()
+
+    def __len__(self):
+        # total read grants
+        return sum(bits[0].bit_count() for bits in self._by_project)
+
+
+def _iter_bits(bits: int):
+    # walks set bits lowest-first, one step per set bit
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
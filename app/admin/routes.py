@@ -1,33 +1,83 @@
 import os
-import uuid
 from flask import (
-    render_template, request, redirect, url_for, flash, current_app, send_from_directory
+    render_template, request, redirect, url_for, flash, current_app, jsonify, Response,
 )
 from werkzeug.utils import secure_filename
 from flask_jwt_extended import get_jwt_identity
-from ..extensions import db
-from ..models import Document, ProjectAccess, User
-from ..auth.guards import admin_required
+from sqlalchemy import func, select, true
+from ..extensions import (
+    db, perm_cache, token_cache, fragment_cache, password_hasher, limiter, replica_router,
+    request_metrics,
+)
+from ..models import (
+    Document, ProjectAccess, User, Group, GroupMember, GroupProjectAccess, Job, EffectiveAccess,
+)
+from ..auth.guards import admin_required, read_only
+from ..pagination import keyset_page
+from ..access_matrix import AccessMatrix
+from ..uploads import (
+    init_session, load_session, list_parts, write_part, open_assembled, discard_session,
+)
+from ..storage import (
+    get_storage, store_upload, adopt_staged, release_blob, stage_file_uploads, StagingWriter,
+)
+from ..delivery import send_document
+from ..db_pool import pool_stats
+from ..search import search_documents, search_json
+from ..text_index import request_text_index
+from ..access_bulk import parse_json, parse_csv, apply_bulk_access, BulkAccessError
+from ..effective_access import (
+    recompute_pairs, pairs_for_members, pairs_for_group_grant, pairs_for_group_subtree,
+    bump_users, users_with_access,
+)
+from ..jobs import enqueue
 from . import admin_bp
 
+# emails returned by /admin/users/suggest
+SUGGEST_LIMIT = 20
+# members / grants listed under each group on the groups tab; the rest are counted
+GROUP_PREVIEW = 20
+# counts stop here and show as "10000+", so a huge group costs the same as a big one
+GROUP_COUNT_CAP = 10000
+
 @admin_bp.get("/")
 @admin_required
+@read_only
 def dashboard():
     tab = (request.args.get("tab") or "projects").lower()  
     edit_id = request.args.get("edit")
-
-    docs = Document.query.order_by(Document.updated_at.desc()).all()
-    users = User.query.order_by(User.created_at.desc()).all()
-
-    access_rows = ProjectAccess.query.all()
-    
-    access_map = {}
-    for row in access_rows:
-        access_map.setdefault(row.project_id, set()).add(row.user_id)
+    cursor = request.args.get("cursor") or ""
+    q = (request.args.get("q") or "").strip()
+    page_size = current_app.config["DASHBOARD_PAGE_SIZE"]
+
+    docs, users, next_cursor = [], [], None
+    matrix, user_emails = AccessMatrix(), {}
+    groups_view = []
+    jobs = []
+
+    if tab == "projects":
+        if q:
+            # ranked matches instead of the paginated list
+            docs = [doc for doc, _ in search_documents(q, limit=page_size)]
+        else:
+            docs, next_cursor = keyset_page(
+                Document.query, Document.updated_at, Document.id, cursor, page_size
+            )
+        # grant forms take an email (autocompleted by /admin/users/suggest),
+        # so no user list is loaded or rendered here
+        matrix, user_emails = _access_for_projects([d.id for d in docs])
+    elif tab == "users":
+        users, next_cursor = keyset_page(
+            User.query, User.created_at, User.id, cursor, page_size
+        )
+    elif tab == "jobs":
+        jobs = Job.query.order_by(Job.id.desc()).limit(page_size * 2).all()
+    elif tab == "groups":
+        groups_view, next_cursor = _groups_overview(cursor, page_size)
 
     edit_doc = None
     if tab == "projects" and edit_id and edit_id.isdigit():
-        edit_doc = Document.query.get(int(edit_id))
+        edit_doc = db.session.get(Document, int(edit_id))
 
     return render_template(
         "admin_portal.html",
@@ -35,9 +85,144 @@ def dashboard():
         docs=docs,
         users=users,
         edit_doc=edit_doc,
-        access_map=access_map, 
-        access_rows=access_rows,
+        matrix=matrix,
+        user_emails=user_emails,
+        groups_view=groups_view,
+        group_count_cap=GROUP_COUNT_CAP,
+        jobs=jobs,
+        cursor=cursor,
+        next_cursor=next_cursor,
+        q=q,
+    )
+
+
+@admin_bp.get("/users/suggest")
+@admin_required
+@read_only
+def suggest_users():
+    """Emails of grantable users starting with q, for the grant/member email inputs."""
+    q = (request.args.get("q") or "").strip().lower()
+    if len(q) < 2:
+        return jsonify({"emails": []})
+    default_admin_email = (os.getenv("DEFAULT_ADMIN_EMAIL") or "").strip().lower()
+    emails = [
+        email for (email,) in (
+            db.session.query(User.email)
+            .filter(
+                User.role == "user",
+                User.is_active.is_(True),
+                User.email.startswith(q, autoescape=True),
+                User.email != default_admin_email,
+            )
+            .order_by(User.email)
+            .limit(SUGGEST_LIMIT)
+        )
+    ]
+    return jsonify({"emails": emails})
+
+
+@admin_bp.get("/search")
+@admin_required
+@read_only
+def search():
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    return jsonify(search_json(search_documents(request.args.get("q", ""), limit=limit)))
+
+
+def _groups_overview(cursor: str, page_size: int):
+    """
+    One keyset page of groups as
+    [(group, parent_name, members, member_count, grants, grant_count)], plus
+    the next cursor. members/grants hold at most GROUP_PREVIEW rows per group
+    and the counts stop at GROUP_COUNT_CAP, so the page costs the same however
+    large the groups are.
+    """
+    groups, next_cursor = keyset_page(Group.query, Group.created_at, Group.id, cursor, page_size)
+    group_ids = [g.id for g in groups]
+    if not group_ids:
+        return [], next_cursor
+
+    parent_ids = {g.parent_id for g in groups if g.parent_id is not None}
+    names = {}
+    if parent_ids:
+        names = dict(db.session.query(Group.id, Group.name).filter(Group.id.in_(parent_ids)))
+
+    members = _per_group(
+        group_ids,
+        lambda gid: (
+            select(GroupMember.user_id, User.email)
+            .join(User, User.id == GroupMember.user_id)
+            .where(GroupMember.group_id == gid)
+            .order_by(GroupMember.user_id)
+        ),
     )
+    member_counts = _count_per_group(group_ids, GroupMember.group_id)
+    grants = _per_group(
+        group_ids,
+        lambda gid: (
+            select(
+                GroupProjectAccess.project_id, GroupProjectAccess.can_edit,
+                GroupProjectAccess.can_delete, Document.title,
+            )
+            .join(Document, Document.id == GroupProjectAccess.project_id)
+            .where(GroupProjectAccess.group_id == gid)
+            .order_by(GroupProjectAccess.project_id)
+        ),
+    )
+    grant_counts = _count_per_group(group_ids, GroupProjectAccess.group_id)
+
+    return [
+        (
+            g, names.get(g.parent_id),
+            sorted(members.get(g.id, []), key=lambda m: m.email), member_counts.get(g.id, 0),
+            grants.get(g.id, []), grant_counts.get(g.id, 0),
+        )
+        for g in groups
+    ], next_cursor
+
+
+def _per_group(group_ids, rows_for):
+    """{group_id: [row]} with the first GROUP_PREVIEW rows of rows_for(group_id), in one LATERAL query."""
+    page = select(Group.id.label("group_id")).where(Group.id.in_(group_ids)).subquery("page")
+    top = rows_for(page.c.group_id).limit(GROUP_PREVIEW).lateral("top")
+    rows = {}
+    for row in db.session.execute(select(page.c.group_id, *top.c).join_from(page, top, true())):
+        rows.setdefault(row.group_id, []).append(row)
+    return rows
+
+
+def _count_per_group(group_ids, group_col):
+    """{group_id: rows of group_col's table for it}, counting at most GROUP_COUNT_CAP + 1 each."""
+    page = select(Group.id.label("group_id")).where(Group.id.in_(group_ids)).subquery("page")
+    capped = (
+        select(group_col.label("member_of"))
+        .where(group_col == page.c.group_id)
+        .limit(GROUP_COUNT_CAP + 1)
+        .lateral("capped")
+    )
+    return dict(
+        db.session.execute(
+            select(page.c.group_id, func.count(capped.c.member_of))
+            .join_from(page, capped, true())
+            .group_by(page.c.group_id)
+        ).all()
+    )
+
+
+def _access_for_projects(project_ids):
+    """
+    Grants for the projects on the current page only, packed into an
+    AccessMatrix, plus the emails of the users that appear in it.
+    """
+    matrix = AccessMatrix.load(project_ids)
+    granted_ids = {uid for pid in project_ids for uid in matrix.users_for(pid)}
+
+    user_emails = {}
+    if granted_ids:
+        user_emails = dict(
+            db.session.query(User.id, User.email).filter(User.id.in_(granted_ids)).all()
+        )
+    return matrix, user_emails
 
 
 
@@ -48,6 +233,7 @@ def upload_page():
 
 @admin_bp.post("/upload")
 @admin_required
+@stage_file_uploads
 def upload_submit():
     title = (request.form.get("title") or "").strip()
     description = (request.form.get("description") or "").strip()
@@ -62,23 +248,166 @@ def upload_submit():
         return redirect(url_for("admin.upload_page", tab="projects"))
 
     orig = secure_filename(file.filename)
-    stored = f"{uuid.uuid4().hex}_{orig}"
-    path = os.path.join(current_app.config["UPLOAD_FOLDER"], stored)
-    file.save(path)
+    if isinstance(file.stream, StagingWriter):
+        # already written to the staging area while the form was parsed: just publish it
+        blob = adopt_staged(file.stream.staged())
+    else:
+        blob = store_upload(
+            file.stream,
+            max_bytes=current_app.config["MAX_CONTENT_LENGTH"],
+            chunk_size=current_app.config["UPLOAD_CHUNK_SIZE"],
+        )
+
+    _create_document(title, description, blob, orig, file.mimetype)
+
+    flash("Document uploaded!", "success")
+    return redirect(url_for("admin.dashboard", tab="projects"))
 
+
+def _create_document(title, description, blob, orig, mime_type) -> Document:
+    # blob comes from store_upload(), which already holds its reference in this transaction
     doc = Document(
         title=title,
         description=description if description else None,
-        stored_filename=stored,
+        stored_filename=get_storage().key(blob.sha256),
         original_filename=orig,
-        mime_type=file.mimetype,
+        mime_type=mime_type,
+        content_sha256=blob.sha256,
+        size_bytes=blob.size,
         uploaded_by=int(get_jwt_identity()),
     )
     db.session.add(doc)
+    # content search: extraction runs in the job worker, only for content not indexed yet
+    request_text_index(blob.sha256, mime_type, orig)
     db.session.commit()
+    return doc
+
+
+def _doc_json(doc: Document) -> dict:
+    return {
+        "id": doc.id,
+        "title": doc.title,
+        "original_filename": doc.original_filename,
+        "sha256": doc.content_sha256,
+        "size": doc.size_bytes,
+    }
 
-    flash("Document uploaded!", "success")
-    return redirect(url_for("admin.dashboard", tab="projects"))
+
+# -----------------------------
+# STREAMING / RESUMABLE UPLOADS (JSON, for scripted clients)
+# -----------------------------
+# Raw request bodies are read straight from request.stream, so nothing is
+# spooled to a temp file by the multipart parser first.
+# CSRF: send the csrf_access_token cookie value in the X-CSRF-TOKEN header.
+
+@admin_bp.put("/upload/stream")
+@admin_required
+def upload_stream():
+    title = (request.args.get("title") or "").strip()
+    description = (request.args.get("description") or "").strip()
+    orig = secure_filename(request.args.get("filename") or request.headers.get("X-Filename") or "")
+
+    if not title or not orig:
+        return jsonify({"error": "title and filename are required"}), 400
+
+    blob = store_upload(
+        request.stream,
+        max_bytes=current_app.config["MAX_CONTENT_LENGTH"],
+        chunk_size=current_app.config["UPLOAD_CHUNK_SIZE"],
+    )
+
+    doc = _create_document(title, description, blob, orig, request.mimetype or None)
+    return jsonify(_doc_json(doc)), 201
+
+
+@admin_bp.post("/uploads")
+@admin_required
+def upload_init():
+    data = request.get_json(silent=True) or {}
+    title = (data.get("title") or "").strip()
+    orig = secure_filename(data.get("filename") or "")
+    if not title or not orig:
+        return jsonify({"error": "title and filename are required"}), 400
+
+    upload_id = init_session(
+        current_app.config["UPLOAD_FOLDER"],
+        int(get_jwt_identity()),
+        {
+            "title": title,
+            "description": (data.get("description") or "").strip(),
+            "filename": orig,
+            "mime_type": data.get("mime_type"),
+        },
+    )
+    return jsonify({"upload_id": upload_id}), 201
+
+
+@admin_bp.get("/uploads/<upload_id>")
+@admin_required
+def upload_status(upload_id: str):
+    folder = current_app.config["UPLOAD_FOLDER"]
+    meta = load_session(folder, upload_id, int(get_jwt_identity()))
+    parts = list_parts(folder, upload_id)
+    return jsonify({
+        "upload_id": upload_id,
+        "filename": meta["filename"],
+        "parts": {str(n): size for n, size in sorted(parts.items())},
+        "received_bytes": sum(parts.values()),
+    })
+
+
+@admin_bp.put("/uploads/<upload_id>/parts/<int:part_no>")
+@admin_required
+def upload_part(upload_id: str, part_no: int):
+    folder = current_app.config["UPLOAD_FOLDER"]
+    load_session(folder, upload_id, int(get_jwt_identity()))
+    size, sha256 = write_part(
+        folder, upload_id, part_no, request.stream,
+        max_bytes=current_app.config["MAX_CONTENT_LENGTH"],
+        expected_sha256=request.headers.get("X-Part-Sha256"),
+        chunk_size=current_app.config["UPLOAD_CHUNK_SIZE"],
+    )
+    return jsonify({"part": part_no, "size": size, "sha256": sha256})
+
+
+@admin_bp.post("/uploads/<upload_id>/complete")
+@admin_required
+def upload_complete(upload_id: str):
+    folder = current_app.config["UPLOAD_FOLDER"]
+    meta = load_session(folder, upload_id, int(get_jwt_identity()))
+
+    storage = get_storage()
+    reader = open_assembled(folder, upload_id)
+    try:
+        staged = storage.stage(
+            reader,
+            max_bytes=current_app.config["UPLOAD_MAX_FILE_SIZE"],
+            chunk_size=current_app.config["UPLOAD_CHUNK_SIZE"],
+        )
+    finally:
+        reader.close()
+
+    expected = (request.get_json(silent=True) or {}).get("sha256")
+    if expected and expected.lower() != staged.sha256:
+        # keep the parts so the client can fix the bad one and retry
+        storage.discard_staged(staged)
+        return jsonify({"error": "checksum mismatch", "sha256": staged.sha256}), 409
+
+    blob = adopt_staged(staged)
+    doc = _create_document(
+        meta["title"], meta["description"], blob, meta["filename"], meta.get("mime_type"),
+    )
+    discard_session(folder, upload_id)
+    return jsonify(_doc_json(doc)), 201
+
+
+@admin_bp.delete("/uploads/<upload_id>")
+@admin_required
+def upload_abort(upload_id: str):
+    folder = current_app.config["UPLOAD_FOLDER"]
+    load_session(folder, upload_id, int(get_jwt_identity()))
+    discard_session(folder, upload_id)
+    return "", 204
 
 @admin_bp.get("/doc/<int:doc_id>/edit")
 @admin_required
@@ -100,38 +429,35 @@ def edit_doc_submit(doc_id: int):
 @admin_required
 def delete_doc(doc_id: int):
     doc = Document.query.get_or_404(doc_id)
+    affected_user_ids = users_with_access(doc_id)
 
-    # remove file from disk
-    file_path = os.path.join(current_app.config["UPLOAD_FOLDER"], doc.stored_filename)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    # the file is only unlinked (by the job worker) once no other project shares it
+    if release_blob(doc.content_sha256):
+        enqueue("gc_blob", {"sha256": doc.content_sha256})
 
+    # grants go via FK cascade (passive_deletes), nothing is loaded here
     db.session.delete(doc)
     db.session.commit()
+    perm_cache.bump_user(*affected_user_ids)
     flash("Document deleted.", "success")
     return redirect(url_for("admin.dashboard", tab="projects"))
 
 @admin_bp.get("/doc/<int:doc_id>/download")
 @admin_required
+@read_only
+@limiter.limit("download")
 def admin_download(doc_id: int):
     doc = Document.query.get_or_404(doc_id)
-    return send_from_directory(
-        directory=current_app.config["UPLOAD_FOLDER"],
-        path=doc.stored_filename,
-        as_attachment=True,
-        download_name=doc.original_filename,
-    )
+    return send_document(doc)
     
 @admin_bp.post("/projects/<int:doc_id>/access/grant")
 @admin_required
 def grant_project_access(doc_id: int):
-    user_id = (request.form.get("user_id") or "").strip()
-    if not user_id.isdigit():
-        flash("Invalid user.", "error")
+    user_id = _form_user_id()
+    if user_id is None:
+        flash("Unknown user.", "error")
         return redirect(url_for("admin.dashboard", tab="projects"))
 
-    user_id = int(user_id)
-
     Document.query.get_or_404(doc_id)
     User.query.get_or_404(user_id)
 
@@ -152,7 +478,10 @@ def grant_project_access(doc_id: int):
         can_edit=can_edit,
         can_delete=can_delete,
     ))
+    db.session.flush()
+    recompute_pairs([(doc_id, user_id)])
     db.session.commit()
+    perm_cache.bump_user(user_id)
 
     flash("Access granted.", "success")
     return redirect(url_for("admin.dashboard", tab="projects"))
@@ -177,10 +506,41 @@ def update_project_access(doc_id: int):
     row.can_edit = bool(request.form.get("can_edit"))
     row.can_delete = bool(request.form.get("can_delete"))
 
+    db.session.flush()
+    recompute_pairs([(doc_id, user_id)])
     db.session.commit()
+    perm_cache.bump_user(user_id)
     flash("Permissions updated.", "success")
     return redirect(url_for("admin.dashboard", tab="projects"))
 
+@admin_bp.post("/access/bulk")
+@admin_required
+def bulk_project_access():
+    """
+    Many grants/updates/revokes in one request and one transaction.
+    Body: JSON (see access_bulk.parse_json) or text/csv with an
+    action,project_id,user_id,can_edit,can_delete header.
+    """
+    try:
+        if request.mimetype == "text/csv":
+            rows = parse_csv(request.get_data(as_text=True))
+        else:
+            rows = parse_json(request.get_json(silent=True))
+    except BulkAccessError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not rows:
+        return jsonify({"error": "no rows"}), 400
+    if len(rows) > current_app.config["BULK_ACCESS_MAX_ROWS"]:
+        return jsonify({"error": "too many rows"}), 413
+
+    if request.args.get("async") == "1":
+        job = enqueue("bulk_access", {"rows": rows})
+        db.session.commit()
+        return jsonify({"job_id": job.id, "status": job.status}), 202
+
+    return jsonify(apply_bulk_access(rows))
+
 @admin_bp.post("/users/<int:user_id>/permissions")
 @admin_required
 def set_user_permissions(user_id: int):
@@ -213,12 +573,173 @@ def revoke_project_access(doc_id: int):
         return redirect(url_for("admin.dashboard", tab="projects"))
 
     db.session.delete(row)
+    db.session.flush()
+    recompute_pairs([(doc_id, user_id)])
     db.session.commit()
+    perm_cache.bump_user(user_id)
 
     flash("Access revoked.", "success")
     return redirect(url_for("admin.dashboard", tab="projects"))
 
 
+# -----------------------------
+# GROUPS (inherited project access)
+# -----------------------------
+# Every change recomputes effective_access for the affected (project, user)
+# pairs only, in the same transaction as the change itself.
+
+def _form_int(name: str):
+    value = (request.form.get(name) or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def _form_user_id():
+    """user_id from the form, or the id of the grantable user with the posted email."""
+    user_id = _form_int("user_id")
+    if user_id is not None:
+        return user_id
+    email = (request.form.get("email") or "").strip().lower()
+    if not email:
+        return None
+    return db.session.query(User.id).filter(
+        User.email == email, User.role == "user", User.is_active.is_(True)
+    ).scalar()
+
+
+@admin_bp.post("/groups/new")
+@admin_required
+def create_group():
+    name = (request.form.get("name") or "").strip()
+    parent_id = _form_int("parent_id")
+
+    if not name:
+        flash("Group name is required.", "error")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+    if Group.query.filter_by(name=name).first():
+        flash("Group already exists.", "error")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+    if parent_id is not None:
+        Group.query.get_or_404(parent_id)
+
+    # a new group has no members yet, so nothing to recompute
+    db.session.add(Group(name=name, parent_id=parent_id))
+    db.session.commit()
+
+    flash("Group created.", "success")
+    return redirect(url_for("admin.dashboard", tab="groups"))
+
+
+@admin_bp.post("/groups/<int:group_id>/delete")
+@admin_required
+def delete_group(group_id: int):
+    group = Group.query.get_or_404(group_id)
+
+    pairs = pairs_for_group_subtree(group_id)
+    db.session.delete(group)  # nested groups, members and grants go via FK cascade
+    db.session.flush()
+    recompute_pairs(pairs)
+    db.session.commit()
+    bump_users(pairs)
+
+    flash("Group deleted.", "success")
+    return redirect(url_for("admin.dashboard", tab="groups"))
+
+
+@admin_bp.post("/groups/<int:group_id>/members/add")
+@admin_required
+def add_group_member(group_id: int):
+    Group.query.get_or_404(group_id)
+    user_id = _form_user_id()
+    if user_id is None:
+        flash("Unknown user.", "error")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+    User.query.get_or_404(user_id)
+
+    if db.session.get(GroupMember, (group_id, user_id)):
+        flash("User is already a member.", "info")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+
+    db.session.add(GroupMember(group_id=group_id, user_id=user_id))
+    db.session.flush()
+    pairs = pairs_for_members(group_id, [user_id])
+    recompute_pairs(pairs)
+    db.session.commit()
+    bump_users(pairs)
+
+    flash("Member added.", "success")
+    return redirect(url_for("admin.dashboard", tab="groups"))
+
+
+@admin_bp.post("/groups/<int:group_id>/members/remove")
+@admin_required
+def remove_group_member(group_id: int):
+    # user_id from a listed member's button, or the email form for members past the preview
+    user_id = _form_user_id()
+    member = db.session.get(GroupMember, (group_id, user_id)) if user_id is not None else None
+    if not member:
+        flash("Member not found.", "error")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+
+    pairs = pairs_for_members(group_id, [user_id])
+    db.session.delete(member)
+    db.session.flush()
+    recompute_pairs(pairs)
+    db.session.commit()
+    bump_users(pairs)
+
+    flash("Member removed.", "success")
+    return redirect(url_for("admin.dashboard", tab="groups"))
+
+
+@admin_bp.post("/groups/<int:group_id>/access/grant")
+@admin_required
+def grant_group_access(group_id: int):
+    Group.query.get_or_404(group_id)
+    project_id = _form_int("project_id")
+    if project_id is None:
+        flash("Invalid project.", "error")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+    Document.query.get_or_404(project_id)
+
+    # grant or update in one go: the group form always sends the full flag set
+    row = GroupProjectAccess.query.filter_by(group_id=group_id, project_id=project_id).first()
+    if not row:
+        row = GroupProjectAccess(group_id=group_id, project_id=project_id)
+        db.session.add(row)
+    row.can_read = True
+    row.can_edit = bool(request.form.get("can_edit"))
+    row.can_delete = bool(request.form.get("can_delete"))
+
+    db.session.flush()
+    pairs = pairs_for_group_grant(group_id, project_id)
+    recompute_pairs(pairs)
+    db.session.commit()
+    bump_users(pairs)
+
+    flash("Group access saved.", "success")
+    return redirect(url_for("admin.dashboard", tab="groups"))
+
+
+@admin_bp.post("/groups/<int:group_id>/access/revoke")
+@admin_required
+def revoke_group_access(group_id: int):
+    project_id = _form_int("project_id")
+    row = GroupProjectAccess.query.filter_by(group_id=group_id, project_id=project_id).first()
+    if not row:
+        flash("Access not found.", "error")
+        return redirect(url_for("admin.dashboard", tab="groups"))
+
+    pairs = pairs_for_group_grant(group_id, project_id)
+    db.session.delete(row)
+    db.session.flush()
+    recompute_pairs(pairs)
+    db.session.commit()
+    bump_users(pairs)
+
+    flash("Group access revoked.", "success")
+    return redirect(url_for("admin.dashboard", tab="groups"))
+
+
 @admin_bp.get("/users/new")
 @admin_required
 def add_user_page():
@@ -275,9 +796,54 @@ def delete_user(user_id: int):
         flash("Cannot delete user: they have uploaded documents. Delete/reassign documents first.", "error")
         return redirect(url_for("admin.dashboard", tab="users"))
 
-    db.session.delete(user)
+    # locked out and without access from this commit on; the cascades can be
+    # large, so the job worker does the actual delete
+    user.is_active = False
+    db.session.execute(db.delete(EffectiveAccess).where(EffectiveAccess.user_id == user.id))
+    enqueue("delete_user", {"user_id": user.id})
     db.session.commit()
+    perm_cache.bump_user(user.id)
 
-    flash("User deleted.", "success")
+    flash("User deletion queued.", "success")
     return redirect(url_for("admin.dashboard", tab="users"))
 
+
+@admin_bp.get("/jobs/<int:job_id>")
+@admin_required
+def job_status(job_id: int):
+    job = Job.query.get_or_404(job_id)
+    return jsonify({
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "last_error": job.last_error,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    })
+
+
+@admin_bp.get("/stats")
+@admin_required
+def stats():
+    # in-process counters; each worker reports its own numbers
+    return jsonify({
+        "perm_cache": perm_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "fragment_cache": fragment_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "db_pool": pool_stats(db.engine),
+        "replicas": replica_router.stats(),
+        "requests": request_metrics.stats(),
+    })
+
+
+@admin_bp.get("/metrics")
+@admin_required
+def metrics():
+    # Prometheus scrape target; per process, like /stats
+    return Response(
+        request_metrics.prometheus(pool_stats(db.engine)),
+        mimetype="text/plain; version=0.0.4",
+    )
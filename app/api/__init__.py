@@ -0,0 +1,2 @@
+from flask import Blueprint
+api_bp = Blueprint("api", __name__)
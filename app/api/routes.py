@@ -0,0 +1,410 @@
+import json
+import time
+from flask import Response, request, jsonify, current_app, abort, stream_with_context
+from flask_jwt_extended import get_jwt_identity, get_csrf_token, set_access_cookies
+from werkzeug.exceptions import HTTPException
+
+from ..extensions import db, perm_cache, limiter
+from ..models import Document, User, ProjectAccess, EffectiveAccess
+from ..auth.guards import login_required, admin_required, read_only
+from ..auth.tokens import verify_request_token
+from ..auth.login import authenticate, issue_access_token
+from ..pagination import keyset_page
+from ..access_bulk import parse_json, apply_bulk_access, BulkAccessError
+from ..effective_access import project_perm, users_with_access
+from ..storage import release_blob
+from ..jobs import enqueue
+from ..change_log import read_changes, wait_for_commit
+from . import api_bp
+
+# JSON API (/api/v1) for scripts and sync tooling.
+#
+# Auth is the same cookie JWT as the HTML pages: POST /api/v1/login sets it
+# and returns the CSRF token to send as X-CSRF-TOKEN on writes.
+#
+# List endpoints share these query parameters:
+#   ids=1,2,3        batch read: exactly these rows (no paging), plus "missing"
+#   fields=id,title  only these columns are selected and returned
+#   cursor, limit    keyset pagination, newest first; follow next_cursor
+#   compact=1        {"fields": [...], "rows": [[...], ...]} instead of objects
+#
+# GET /changes (long-poll) and /changes/stream (SSE) follow the change log by
+# seq: pass the last seq you processed as since= (or Last-Event-ID).
+
+PROJECT_FIELDS = {
+    "id": Document.id,
+    "title": Document.title,
+    "description": Document.description,
+    "original_filename": Document.original_filename,
+    "mime_type": Document.mime_type,
+    "size": Document.size_bytes,
+    "sha256": Document.content_sha256,
+    "uploaded_by": Document.uploaded_by,
+    "uploaded_at": Document.uploaded_at,
+    "updated_at": Document.updated_at,
+}
+# only for users: their own effective permissions on each project
+PERM_FIELDS = {
+    "can_read": EffectiveAccess.can_read,
+    "can_edit": EffectiveAccess.can_edit,
+    "can_delete": EffectiveAccess.can_delete,
+}
+USER_FIELDS = {
+    "id": User.id,
+    "email": User.email,
+    "role": User.role,
+    "can_create_projects": User.can_create_projects,
+    "created_at": User.created_at,
+}
+ACCESS_FIELDS = {
+    "id": ProjectAccess.id,
+    "project_id": ProjectAccess.project_id,
+    "user_id": ProjectAccess.user_id,
+    "can_read": ProjectAccess.can_read,
+    "can_edit": ProjectAccess.can_edit,
+    "can_delete": ProjectAccess.can_delete,
+    "created_at": ProjectAccess.created_at,
+}
+
+# seconds of silence before an SSE comment is sent
+SSE_KEEPALIVE = 15
+
+DEFAULT_PROJECT_FIELDS = ["id", "title", "description", "original_filename", "size", "updated_at"]
+
+
+@api_bp.errorhandler(HTTPException)
+def api_error(e):
+    response = jsonify({"error": e.description})
+    response.status_code = e.code
+    # keep what the exception adds (Retry-After on 429/503, Allow on 405, ...)
+    for name, value in e.get_headers():
+        if name.lower() != "content-type":
+            response.headers[name] = value
+    return response
+
+
+# -----------------------------
+# REQUEST HELPERS
+# -----------------------------
+
+def _is_admin() -> bool:
+    return verify_request_token().get("role") == "admin"
+
+
+def _int_list(name: str) -> list:
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return []
+    values = [v.strip() for v in raw.split(",") if v.strip()]
+    if not all(v.isdigit() for v in values):
+        abort(400, description=f"{name} must be a comma-separated list of integers")
+    if len(values) > current_app.config["API_MAX_IDS"]:
+        abort(400, description=f"at most {current_app.config['API_MAX_IDS']} {name}")
+    return [int(v) for v in values]
+
+
+def _fields(available: dict, default: list) -> list:
+    raw = (request.args.get("fields") or "").strip()
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        abort(400, description=f"unknown fields: {', '.join(unknown)}; available: {', '.join(available)}")
+    return fields
+
+
+def _limit() -> int:
+    limit = request.args.get("limit", current_app.config["API_PAGE_SIZE"], type=int)
+    return max(1, min(limit, current_app.config["API_MAX_PAGE_SIZE"]))
+
+
+def _json_body() -> dict:
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="expected a JSON object")
+    return data
+
+
+def _value(v):
+    return v.isoformat() if hasattr(v, "isoformat") else v
+
+
+def _listing(available: dict, fields: list, query_for, ts_col, id_col):
+    """
+    Shared body of the list endpoints. query_for(columns) builds the filtered
+    query; the id/timestamp columns needed for ids/cursor are always selected.
+    """
+    columns = {f: available[f] for f in fields}
+    for col in (id_col, ts_col):
+        columns.setdefault(col.key, col)
+    query = query_for([col.label(name) for name, col in columns.items()])
+
+    ids = _int_list("ids")
+    extra = {}
+    if ids:
+        rows = query.filter(id_col.in_(ids)).order_by(id_col).all()
+        found = {getattr(r, id_col.key) for r in rows}
+        extra["missing"] = [i for i in ids if i not in found]
+    else:
+        rows, extra["next_cursor"] = keyset_page(
+            query, ts_col, id_col, request.args.get("cursor") or "", _limit()
+        )
+
+    if request.args.get("compact") == "1":
+        body = {"fields": fields, "rows": [[_value(r._mapping[f]) for f in fields] for r in rows]}
+    else:
+        body = {"items": [{f: _value(r._mapping[f]) for f in fields} for r in rows]}
+    body.update(extra)
+    return jsonify(body)
+
+
+def _project_json(doc: Document) -> dict:
+    return {f: _value(getattr(doc, col.key)) for f, col in PROJECT_FIELDS.items()}
+
+
+def _project_or_404(doc_id: int, need: str) -> Document:
+    """Admins may do anything; users need the named permission (403 otherwise)."""
+    if not _is_admin():
+        if not getattr(project_perm(int(get_jwt_identity()), doc_id), need):
+            abort(403, description="permission denied")
+    doc = db.session.get(Document, doc_id)
+    if doc is None:
+        abort(404, description="project not found")
+    return doc
+
+
+# -----------------------------
+# AUTH
+# -----------------------------
+
+@api_bp.post("/login")
+@limiter.limit("login")
+def login():
+    data = _json_body()
+    email = (data.get("email") or "").strip().lower()
+    user = authenticate(email, data.get("password") or "")
+    if not user:
+        abort(401, description="invalid email or password")
+
+    token = issue_access_token(user)
+    resp = jsonify({
+        "id": user.id,
+        "email": user.email,
+        "role": user.role,
+        # send back as X-CSRF-TOKEN on POST/PATCH/DELETE
+        "csrf_token": get_csrf_token(token),
+    })
+    set_access_cookies(resp, token)
+    return resp
+
+
+# -----------------------------
+# PROJECTS
+# -----------------------------
+
+@api_bp.get("/projects")
+@login_required
+@read_only
+def list_projects():
+    if _is_admin():
+        available = PROJECT_FIELDS
+
+        def query_for(columns):
+            return db.session.query(*columns).select_from(Document)
+    else:
+        available = {**PROJECT_FIELDS, **PERM_FIELDS}
+        user_id = int(get_jwt_identity())
+
+        def query_for(columns):
+            return (
+                db.session.query(*columns)
+                .select_from(Document)
+                .join(EffectiveAccess, EffectiveAccess.project_id == Document.id)
+                .filter(EffectiveAccess.user_id == user_id, EffectiveAccess.can_read.is_(True))
+            )
+
+    fields = _fields(available, DEFAULT_PROJECT_FIELDS)
+    return _listing(available, fields, query_for, Document.updated_at, Document.id)
+
+
+@api_bp.get("/projects/<int:doc_id>")
+@login_required
+@read_only
+def get_project(doc_id: int):
+    return jsonify(_project_json(_project_or_404(doc_id, "can_read")))
+
+
+@api_bp.patch("/projects/<int:doc_id>")
+@login_required
+def update_project(doc_id: int):
+    doc = _project_or_404(doc_id, "can_edit")
+    data = _json_body()
+
+    if "title" in data:
+        title = (data.get("title") or "").strip()
+        if not title:
+            abort(400, description="title cannot be empty")
+        doc.title = title
+    if "description" in data:
+        doc.description = (data.get("description") or "").strip() or None
+
+    db.session.commit()
+    return jsonify(_project_json(doc))
+
+
+@api_bp.delete("/projects/<int:doc_id>")
+@login_required
+def delete_project(doc_id: int):
+    doc = _project_or_404(doc_id, "can_delete")
+    affected_user_ids = users_with_access(doc_id)
+
+    # the file is only unlinked (by the job worker) once no other project shares it
+    if release_blob(doc.content_sha256):
+        enqueue("gc_blob", {"sha256": doc.content_sha256})
+
+    db.session.delete(doc)
+    db.session.commit()
+    perm_cache.bump_user(*affected_user_ids)
+    return "", 204
+
+
+# -----------------------------
+# USERS (admin)
+# -----------------------------
+
+@api_bp.get("/users")
+@admin_required
+@read_only
+def list_users():
+    role = (request.args.get("role") or "").strip()
+
+    def query_for(columns):
+        query = db.session.query(*columns).select_from(User)
+        return query.filter(User.role == role) if role else query
+
+    fields = _fields(USER_FIELDS, list(USER_FIELDS))
+    return _listing(USER_FIELDS, fields, query_for, User.created_at, User.id)
+
+
+# -----------------------------
+# ACCESS (admin)
+# -----------------------------
+
+@api_bp.get("/access")
+@admin_required
+@read_only
+def list_access():
+    """Direct grants, optionally for some projects and/or users."""
+    project_ids = _int_list("project_ids")
+    user_ids = _int_list("user_ids")
+
+    def query_for(columns):
+        query = db.session.query(*columns).select_from(ProjectAccess)
+        if project_ids:
+            query = query.filter(ProjectAccess.project_id.in_(project_ids))
+        if user_ids:
+            query = query.filter(ProjectAccess.user_id.in_(user_ids))
+        return query
+
+    fields = _fields(ACCESS_FIELDS, list(ACCESS_FIELDS))
+    return _listing(ACCESS_FIELDS, fields, query_for, ProjectAccess.created_at, ProjectAccess.id)
+
+
+@api_bp.post("/access/batch")
+@admin_required
+def batch_access():
+    """Same body and result as POST /admin/access/bulk (JSON): rows and/or matrix."""
+    try:
+        rows = parse_json(request.get_json(silent=True))
+    except BulkAccessError as e:
+        abort(400, description=str(e))
+
+    if not rows:
+        abort(400, description="no rows")
+    if len(rows) > current_app.config["BULK_ACCESS_MAX_ROWS"]:
+        abort(413, description="too many rows")
+
+    if request.args.get("async") == "1":
+        job = enqueue("bulk_access", {"rows": rows})
+        db.session.commit()
+        return jsonify({"job_id": job.id, "status": job.status}), 202
+
+    return jsonify(apply_bulk_access(rows))
+
+
+# -----------------------------
+# CHANGE FEED (admin)
+# -----------------------------
+
+def _since() -> int:
+    raw = request.args.get("since") or request.headers.get("Last-Event-ID") or "0"
+    if not raw.isdigit():
+        abort(400, description="since must be a sequence number")
+    return int(raw)
+
+
+def _feed_limit() -> int:
+    max_limit = current_app.config["CHANGE_FEED_MAX_LIMIT"]
+    return max(1, min(request.args.get("limit", max_limit, type=int), max_limit))
+
+
+@api_bp.get("/changes")
+@admin_required
+def list_changes():
+    """
+    Entries with seq > since, oldest first. With wait=N (seconds) an empty
+    result is held open until something commits or N runs out.
+    """
+    since, limit = _since(), _feed_limit()
+    wait = max(0.0, min(request.args.get("wait", 0, type=float), current_app.config["CHANGE_FEED_MAX_WAIT"]))
+    poll = current_app.config["CHANGE_FEED_POLL"]
+    deadline = time.monotonic() + wait
+
+    while True:
+        changes = read_changes(since, limit)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            break
+        # no connection held while waiting; commits by other processes show up on the next poll
+        db.session.close()
+        wait_for_commit(min(poll, remaining))
+
+    return jsonify({
+        "changes": changes,
+        "next_since": changes[-1]["seq"] if changes else since,
+    })
+
+
+@api_bp.get("/changes/stream")
+@admin_required
+def stream_changes():
+    """Server-sent events; reconnecting clients resume from Last-Event-ID."""
+    since, limit = _since(), _feed_limit()
+    poll = current_app.config["CHANGE_FEED_POLL"]
+    # bounded so proxies and clients reconnect (and re-authenticate) now and then
+    stop_at = time.monotonic() + current_app.config["CHANGE_FEED_STREAM_SECONDS"]
+
+    def events(since):
+        yield f"retry: {int(poll * 1000)}\n\n"
+        last_sent = time.monotonic()
+        while time.monotonic() < stop_at:
+            changes = read_changes(since, limit)
+            db.session.close()
+            for change in changes:
+                since = change["seq"]
+                yield f"id: {since}\nevent: change\ndata: {json.dumps(change)}\n\n"
+            if changes:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > SSE_KEEPALIVE:
+                # also how a closed connection is noticed
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            if len(changes) < limit:
+                wait_for_commit(poll)
+
+    return Response(
+        stream_with_context(events(since)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,285 @@
+"""
+ASGI serving mode (see asgi.py at the repository root).
+
+Under a WSGI server every download holds a worker thread for as long as the
+client takes to receive it. ASGIAdapter runs the same Flask app, with the
+same guards, ACL checks, rate limits and delivery code, but only the request
+handling itself runs on a thread:
+
+  1. the Flask app is dispatched on a small thread pool as soon as the
+     request head arrives; wsgi.input is fed from the event loop through a
+     bounded queue, so the handler streams the body while it is uploaded
+     (a full queue stops reading from the client: backpressure);
+  2. the response body is read chunk by chunk on that pool and each chunk is
+     awaited into the socket, so a slow reader applies backpressure instead of
+     buffering, and costs no thread while the chunk waits to drain.
+
+An upload holds a thread while its handler reads the body, as under any
+WSGI server; a download holds none while it waits on the client.
+
+Long-lived responses (ASGI_STREAM_PATHS: the change feed) block a thread
+for their whole lifetime, so they run on a separate pool of
+ASGI_STREAM_THREADS and get a 503 when it is full, instead of starving the
+main pool.
+"""
+import asyncio
+import contextvars
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import ClientDisconnected
+
+_BODY_DONE = object()
+
+
+class ASGIAdapter:
+    def __init__(self, app):
+        self.app = app
+        self.body_queue = app.config["ASGI_BODY_QUEUE"]
+        self._pool = ThreadPoolExecutor(
+            max_workers=app.config["ASGI_THREADS"], thread_name_prefix="asgi",
+        )
+        self.stream_paths = tuple(
+            p.strip() for p in app.config["ASGI_STREAM_PATHS"].split(",") if p.strip()
+        )
+        self.stream_slots = app.config["ASGI_STREAM_THREADS"]
+        self._stream_pool = ThreadPoolExecutor(
+            max_workers=self.stream_slots, thread_name_prefix="asgi-stream",
+        )
+        self._streams = 0  # only touched on the event loop
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._pool.shutdown(wait=False)
+                self._stream_pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # -----------------------------
+    # REQUEST
+    # -----------------------------
+
+    async def _http(self, scope, receive, send):
+        pool = self._pool
+        stream = scope["path"].startswith(self.stream_paths) if self.stream_paths else False
+        if stream:
+            if self._streams >= self.stream_slots:
+                await _plain(send, 503, b"Too many open streams", [(b"retry-after", b"5")])
+                return
+            self._streams += 1
+            pool = self._stream_pool
+        try:
+            await self._serve(scope, receive, send, pool)
+        finally:
+            if stream:
+                self._streams -= 1
+
+    async def _serve(self, scope, receive, send, pool):
+        loop = asyncio.get_running_loop()
+        # every step of this request runs in one context, whichever pool thread picks it up
+        ctx = contextvars.copy_context()
+
+        def run(fn, *args):
+            return loop.run_in_executor(pool, ctx.run, fn, *args)
+
+        body = _BodyReader(loop, self.body_queue)
+        disconnected = asyncio.Event()
+        pump = asyncio.ensure_future(_pump(receive, body, disconnected))
+        try:
+            status, headers, iterable = await run(self._dispatch, _environ(scope, body))
+            try:
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                iterator = iter(iterable)
+                while not disconnected.is_set():
+                    chunk = await run(next, iterator, _BODY_DONE)
+                    if chunk is _BODY_DONE:
+                        break
+                    if chunk:
+                        # returns once the server has taken the chunk: backpressure
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if not disconnected.is_set():
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+            finally:
+                if hasattr(iterable, "close"):
+                    await run(iterable.close)
+        finally:
+            pump.cancel()
+
+    def _dispatch(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+            return _no_write
+
+        iterable = self.app(environ, start_response)
+        if not started:
+            # the status is only known once the first chunk is produced
+            first = next(iter(iterable), b"")
+            return started["status"], started["headers"], _Prepend(first, iterable)
+        return started["status"], started["headers"], iterable
+
+
+class _Prepend:
+    def __init__(self, first, iterable):
+        self.first = first
+        self.iterable = iterable
+
+    def __iter__(self):
+        yield self.first
+        yield from self.iterable
+
+    def close(self):
+        if hasattr(self.iterable, "close"):
+            self.iterable.close()
+
+
+def _no_write(data):
+    raise RuntimeError("the write() callable is not supported; return an iterable")
+
+
+class _BodyReader:
+    """
+    wsgi.input for one request. The event loop puts received chunks into a
+    bounded asyncio queue (_pump); read() runs on the worker thread and takes
+    them out. b"" marks the end of the body, None a client disconnect.
+    """
+
+    def __init__(self, loop, max_chunks: int):
+        self._loop = loop
+        self._queue = asyncio.Queue(max_chunks)
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def put(self, chunk):
+        await self._queue.put(chunk)
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False at the end of the body."""
+        if self._eof:
+            return False
+        chunk = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+        if chunk is None:
+            self._eof = True
+            raise ClientDisconnected()
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def _take(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            while self._fill():
+                pass
+            return self._take(len(self._buffer))
+        while len(self._buffer) < size and self._fill():
+            pass
+        return self._take(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        while b"\n" not in self._buffer and (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        if size >= 0:
+            end = min(end, size)
+        return self._take(end)
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+
+async def _pump(receive, body: _BodyReader, disconnected: asyncio.Event):
+    """Owns receive(): body chunks into the reader's queue, then wait for a disconnect."""
+    more = True
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            if more:
+                await body.put(None)
+            return
+        if more:
+            chunk = message.get("body", b"")
+            more = message.get("more_body", False)
+            if chunk:
+                # waits while the queue is full: the client is read no faster than the app
+                await body.put(chunk)
+            if not more:
+                await body.put(b"")
+
+
+async def _plain(send, status: int, body: bytes, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode()), *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _environ(scope, body) -> dict:
+    """PEP 3333 environ for an ASGI http scope."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        # read until the end of the body (chunked uploads have no Content-Length);
+        # werkzeug still enforces MAX_CONTENT_LENGTH while reading
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == "CONTENT_LENGTH":
+            environ["CONTENT_LENGTH"] = value
+            continue
+        key = f"HTTP_{name}"
+        if key in environ:
+            # HTTP/2 clients may send one cookie header per cookie
+            value = environ[key] + ("; " if key == "HTTP_COOKIE" else ",") + value
+        environ[key] = value
+    return environ
@@ -1,20 +1,27 @@
 from functools import wraps
-from flask import abort
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask import abort, g
+from .tokens import verify_request_token
 
 def login_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        verify_jwt_in_request()
+        verify_request_token()
         return fn(*args, **kwargs)
     return wrapper
 
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        verify_jwt_in_request()
-        claims = get_jwt()
+        claims = verify_request_token()
         if claims.get("role") != "admin":
             abort(403)
         return fn(*args, **kwargs)
     return wrapper
+
+def read_only(fn):
+    # document/blob queries in this view may go to a read replica (see app/db_routing.py)
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,24 @@
+from flask_jwt_extended import create_access_token
+
+from ..extensions import db
+from ..models import User
+
+
+def authenticate(email: str, password: str):
+    """The User for these credentials, or None. Shared by the login form and the JSON API."""
+    user = User.query.filter_by(email=email).first()
+    if not user or not user.check_password(password) or not user.is_active:
+        return None
+
+    # stored with an older algorithm/cost: upgrade now that we have the plaintext
+    if user.password_needs_rehash():
+        user.set_password(password)
+        db.session.commit()
+    return user
+
+
+def issue_access_token(user) -> str:
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={"role": user.role, "email": user.email},
+    )
@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def normalize_method(method: str) -> str:
+    """Spell out Werkzeug's defaults so stored hashes can be compared to the policy."""
+    name, *args = method.split(":")
+    if name == "scrypt":
+        return "scrypt:" + ":".join(args or ["32768", "8", "1"])
+    if name == "pbkdf2":
+        if len(args) == 0:
+            args = ["sha256", "600000"]
+        elif len(args) == 1:
+            args = [args[0], "600000"]
+        return "pbkdf2:" + ":".join(args)
+    raise ValueError(f"unsupported PASSWORD_HASH_METHOD {method!r}")
+
+
+class PasswordHasher:
+    """
+    Password hashing policy plus a small bounded pool for the KDF work.
+
+    hashlib's scrypt/pbkdf2 release the GIL, so a few threads are enough to
+    cap how many CPUs a login burst can take. At most `workers` hashes run at
+    once and `queue_size` more may wait; beyond that callers get a 503 with
+    Retry-After instead of piling onto every request thread.
+    """
+
+    def __init__(self, method: str = "scrypt", workers: int = 2, queue_size: int = 32,
+                 timeout: float = 10.0):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0, "rejected": 0, "completed": 0, "in_flight": 0,
+            "hash_seconds_total": 0.0, "hash_seconds_max": 0.0,
+            "wait_seconds_total": 0.0,
+        }
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.get("PASSWORD_HASH_METHOD", self.method))
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.queue_size = app.config.get("PASSWORD_HASH_QUEUE", self.queue_size)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        app.extensions["password_hasher"] = self
+
+    # -----------------------------
+    # POLICY
+    # -----------------------------
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def verify(self, stored_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        stored_method = (stored_hash or "").split("$", 1)[0]
+        try:
+            return normalize_method(stored_method) != self.method
+        except ValueError:
+            return True
+
+    # -----------------------------
+    # POOL
+    # -----------------------------
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="kdf"
+                    )
+        return self._pool
+
+    def _run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise ServiceUnavailable("Too many logins in progress, try again shortly.",
+                                     retry_after=1)
+        queued_at = time.monotonic()
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+
+        def timed():
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                took = time.monotonic() - started
+                with self._lock:
+                    self._stats["completed"] += 1
+                    self._stats["in_flight"] -= 1
+                    self._stats["hash_seconds_total"] += took
+                    self._stats["hash_seconds_max"] = max(self._stats["hash_seconds_max"], took)
+                    self._stats["wait_seconds_total"] += started - queued_at
+                # held until the KDF really finishes, even if the caller gave up
+                self._slots.release()
+
+        try:
+            future = self._executor().submit(timed)
+        except BaseException:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+            self._slots.release()
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            raise ServiceUnavailable("Login is taking too long, try again shortly.",
+                                     retry_after=1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = max(stats["in_flight"] - self.workers, 0)
+        stats.update(method=self.method, workers=self.workers, queue_size=self.queue_size)
+        return stats
@@ -1,24 +1,14 @@
 from flask import render_template, request, redirect, url_for, flash
 from flask_jwt_extended import (
-    create_access_token,
     set_access_cookies,
     unset_jwt_cookies,
-    get_jwt,
-    verify_jwt_in_request,
 )
-from ..extensions import db
+from ..extensions import db, limiter
 from ..models import User
 from . import auth_bp
 from ..models import ProjectAccess
-from flask_jwt_extended import get_csrf_token, decode_token
-from flask import request
-
-def get_csrf_from_jwt_cookie():
-    token = request.cookies.get("access_token_cookie")
-    if not token:
-        return None
-    decoded = decode_token(token)
-    return decoded.get("csrf")
+from .tokens import verify_request_token
+from .login import authenticate, issue_access_token
 
 
 def _redirect_by_role(role: str):
@@ -34,21 +24,18 @@ def login_page():
     return render_template("login.html")
 
 @auth_bp.post("/login")
+@limiter.limit("login")
 def login_submit():
     email = (request.form.get("email") or "").strip().lower()
     password = request.form.get("password") or ""
 
-    user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    user = authenticate(email, password)
+    if not user:
         flash("Invalid email or password", "error")
         return redirect(url_for("auth.login_page"))
 
-    access_token = create_access_token(
-        identity=str(user.id),
-        additional_claims={"role": user.role, "email": user.email},
-    )
     resp = _redirect_by_role(user.role)
-    set_access_cookies(resp, access_token)
+    set_access_cookies(resp, issue_access_token(user))
     return resp
 
 @auth_bp.get("/admin-signup")
@@ -85,5 +72,4 @@ def logout():
 
 # Small helper for templates/redirect guarding
 def current_user_role():
-    verify_jwt_in_request()
-    return get_jwt().get("role")
+    return verify_request_token().get("role")
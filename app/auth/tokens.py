@@ -0,0 +1,85 @@
+import hmac
+from flask import g, request
+from flask_jwt_extended import decode_token, get_unverified_jwt_headers
+from flask_jwt_extended.config import config
+from flask_jwt_extended.exceptions import CSRFError, NoAuthorizationError
+from flask_jwt_extended.internal_utils import (
+    custom_verification_for_token,
+    verify_token_not_blocklisted,
+    verify_token_type,
+)
+
+from ..extensions import token_cache
+
+# Request-scoped JWT handling for the cookie tokens this app issues.
+#
+# flask_jwt_extended decodes the cookie again on every verify_jwt_in_request()
+# / decode_token() call. Here the token is verified once per request and the
+# result is stored where get_jwt()/get_jwt_identity() read it, and verified
+# tokens are remembered across requests in token_cache until they expire.
+# Claims dicts are shared between requests: treat them as read-only.
+
+
+def _cached_decode(encoded: str):
+    hit = token_cache.get(encoded)
+    if hit is not None:
+        return hit
+    claims = decode_token(encoded)  # signature, exp, nbf, aud/iss
+    header = get_unverified_jwt_headers(encoded)
+    token_cache.put(encoded, claims, header)
+    return claims, header
+
+
+def _check_csrf(claims: dict) -> None:
+    if not config.cookie_csrf_protect or request.method not in config.csrf_request_methods:
+        return
+    value = request.headers.get(config.access_csrf_header_name)
+    if not value and config.csrf_check_form:
+        value = request.form.get(config.access_csrf_field_name)
+    if not value:
+        raise CSRFError("Missing CSRF token")
+    expected = claims.get("csrf")
+    if not expected or not hmac.compare_digest(str(expected), str(value)):
+        raise CSRFError("CSRF double submit tokens do not match")
+
+
+def verify_request_token() -> dict:
+    """
+    Drop-in for verify_jwt_in_request() on cookie-authenticated routes.
+    Verifies at most once per request; later calls return the same claims.
+    """
+    if getattr(g, "_jwt_extended_jwt", None):
+        return g._jwt_extended_jwt
+    if request.method in config.exempt_methods:
+        return {}
+
+    encoded = request.cookies.get(config.access_cookie_name)
+    if not encoded:
+        raise NoAuthorizationError(f'Missing cookie "{config.access_cookie_name}"')
+
+    claims, header = _cached_decode(encoded)
+    _check_csrf(claims)
+    verify_token_type(claims, refresh=False)
+    verify_token_not_blocklisted(header, claims)
+    custom_verification_for_token(header, claims)
+
+    g._jwt_extended_jwt_user = None  # no user_lookup_loader registered
+    g._jwt_extended_jwt_header = header
+    g._jwt_extended_jwt = claims
+    g._jwt_extended_jwt_location = "cookies"
+    return claims
+
+
+def request_csrf_token():
+    """CSRF value of the current cookie token for forms, or None. Never raises."""
+    claims = getattr(g, "_jwt_extended_jwt", None)
+    if claims:
+        return claims.get("csrf")
+    encoded = request.cookies.get(config.access_cookie_name)
+    if not encoded:
+        return None
+    try:
+        claims, _ = _cached_decode(encoded)
+    except Exception:
+        return None
+    return claims.get("csrf")
@@ -1,92 +1,89 @@
 import os
-from sqlalchemy import text
-from werkzeug.security import generate_password_hash
+from datetime import datetime
+import click
+from flask import current_app
+from sqlalchemy import text, select, func, literal
 
-from .extensions import db
+from .extensions import db, password_hasher
 
+# first key of the advisory lock that makes bootstrap a single-runner step
+_LOCK_NAMESPACE = 0x0B00
 
-def ensure_default_admin():
-    email = (os.getenv("DEFAULT_ADMIN_EMAIL") or "").strip().lower()
-    password = os.getenv("DEFAULT_ADMIN_PASSWORD") or ""
+_schema_ok = False
 
-    # Don't crash during migrations/startup
-    if not email or not password:
-        return
 
-    try:
-        with db.engine.begin() as conn:
-            # 1) If users table doesn't exist yet, skip
-            users_table_exists = conn.execute(text("""
-                SELECT EXISTS (
-                  SELECT 1
-                  FROM information_schema.tables
-                  WHERE table_schema='public' AND table_name='users'
-                )
-            """)).scalar()
+def schema_is_current(conn) -> bool:
+    """
+    True when the database is at the Alembic head this code ships with.
+    One SELECT on alembic_version instead of probing information_schema
+    table by table; once it has matched, the process does not ask again.
+    """
+    global _schema_ok
+    if not _schema_ok:
+        from alembic.config import Config as AlembicConfig
+        from alembic.runtime.migration import MigrationContext
+        from alembic.script import ScriptDirectory
 
-            if not users_table_exists:
-                return
+        cfg = AlembicConfig()
+        cfg.set_main_option("script_location", current_app.config["MIGRATIONS_DIR"])
+        heads = set(ScriptDirectory.from_config(cfg).get_heads())
+        _schema_ok = set(MigrationContext.configure(conn).get_current_heads()) == heads
+    return _schema_ok
 
-            # 2) Check if admin user exists (ONLY select existing columns!)
-            row = conn.execute(
-                text("SELECT id, role FROM users WHERE email = :email LIMIT 1"),
-                {"email": email},
-            ).fetchone()
 
-            if row:
-                # enforce role admin
-                if row.role != "admin":
-                    conn.execute(
-                        text("UPDATE users SET role = 'admin' WHERE id = :id"),
-                        {"id": row.id},
-                    )
+def ensure_default_admin(wait: bool = True) -> str:
+    """
+    Create (or promote) DEFAULT_ADMIN_EMAIL. Safe to run from many processes at
+    once: a Postgres advisory lock elects one runner. With wait=False the
+    others return "skipped" immediately instead of queueing behind it.
+    """
+    email = (os.getenv("DEFAULT_ADMIN_EMAIL") or "").strip().lower()
+    password = os.getenv("DEFAULT_ADMIN_PASSWORD") or ""
+    if not email or not password:
+        return "not configured"
 
-                # 3) If new column exists after migration, optionally set it
-                col_exists = conn.execute(text("""
-                    SELECT EXISTS (
-                      SELECT 1
-                      FROM information_schema.columns
-                      WHERE table_schema='public'
-                        AND table_name='users'
-                        AND column_name='can_create_projects'
-                    )
-                """)).scalar()
+    with db.engine.begin() as conn:
+        if wait:
+            conn.execute(select(func.pg_advisory_xact_lock(literal(_LOCK_NAMESPACE), 0)))
+        elif not conn.execute(select(func.pg_try_advisory_xact_lock(literal(_LOCK_NAMESPACE), 0))).scalar():
+            return "skipped"
 
-                if col_exists:
-                    conn.execute(
-                        text("UPDATE users SET can_create_projects = TRUE WHERE id = :id"),
-                        {"id": row.id},
-                    )
+        if not schema_is_current(conn):
+            return "schema not at head; run `flask db upgrade` first"
 
-                return
+        row = conn.execute(
+            text("SELECT id, role, can_create_projects FROM users WHERE email = :email"),
+            {"email": email},
+        ).fetchone()
+        if row and row.role == "admin" and row.can_create_projects:
+            return "exists"
 
-            # 4) Insert default admin (columns that definitely exist in your old schema)
-            password_hash = generate_password_hash(password)
+        if row:
             conn.execute(
-                text("""
-                    INSERT INTO users (email, password_hash, role)
-                    VALUES (:email, :password_hash, 'admin')
-                """),
-                {"email": email, "password_hash": password_hash},
+                text("UPDATE users SET role = 'admin', can_create_projects = TRUE WHERE id = :id"),
+                {"id": row.id},
             )
+            return "promoted"
 
-            # If column exists (after migration), set it too
-            col_exists = conn.execute(text("""
-                SELECT EXISTS (
-                  SELECT 1
-                  FROM information_schema.columns
-                  WHERE table_schema='public'
-                    AND table_name='users'
-                    AND column_name='can_create_projects'
-                )
-            """)).scalar()
+        conn.execute(
+            text("""
+                INSERT INTO users (email, password_hash, role, can_create_projects, created_at)
+                VALUES (:email, :password_hash, 'admin', TRUE, :created_at)
+            """),
+            # naive UTC like the models' datetime.utcnow default; now() would
+            # store the server's local time in a timestamp-without-zone column
+            {
+                "email": email,
+                "password_hash": password_hasher.hash(password),
+                "created_at": datetime.utcnow(),
+            },
+        )
+        return "created"
 
-            if col_exists:
-                conn.execute(
-                    text("UPDATE users SET can_create_projects = TRUE WHERE email = :email"),
-                    {"email": email},
-                )
 
-    except Exception:
-        # DB might be unreachable or in flux during migration; don't block app startup
-        return
+def init_bootstrap(app):
+    @app.cli.command("bootstrap")
+    @click.option("--no-wait", is_flag=True, help="Skip if another process holds the bootstrap lock.")
+    def bootstrap_command(no_wait):
+        """Create the default admin from DEFAULT_ADMIN_EMAIL/PASSWORD (run after `flask db upgrade`)."""
+        click.echo(f"default admin: {ensure_default_admin(wait=not no_wait)}")
@@ -0,0 +1,315 @@
+"""
+Change feed (change_log table) for downstream indexers and audit.
+
+Every create/update/delete of a tracked model is recorded by session events:
+after_flush collects what the ORM wrote, and before_commit inserts the
+entries in the same transaction. Bulk Core writes (access_bulk) call
+record() themselves.
+
+Writers take no lock: an entry is inserted without a seq and stamped with
+its transaction id. assign_seqs() (run by the readers) later gives seqs, from
+the change_log sequence, to the entries of transactions older than the oldest
+one still in flight (the snapshot's xmin). Everything below that watermark
+has committed or rolled back and no new entry can appear there, so a
+consumer that has seen seq N will never later see a smaller seq appear. The
+price is that one long-running writer holds back the feed entries committed
+after it started until it finishes.
+
+Entries carry the row's tracked columns (a snapshot, not a diff), so once
+compaction has kept only the newest entry per entity, replaying the log from
+any point still ends in the current state. Deleting a project or user also
+removes its grants through FK cascades; those are not logged separately.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import g, has_request_context
+from sqlalchemy import BigInteger, Text, cast, event, func, inspect, literal, select
+from sqlalchemy.orm import aliased
+
+from .extensions import db, perm_cache
+from .db_routing import RoutingSession
+from .models import ChangeLog, Document, Group, GroupMember, GroupProjectAccess, ProjectAccess, User
+
+# first key of the advisory lock that lets one process at a time assign seqs
+_LOCK_KEY = 0x0C1A
+
+# the sequence that used to be seq's default (migration f2c6d8e0a1b3)
+_SEQ = db.Sequence("change_log_seq_seq")
+
+ASSIGN_BATCH = 10000
+COMPACT_BATCH = 10000
+
+# model -> (entity name, key columns, columns copied into data)
+TRACKED = {
+    Document: ("project", ("id",), (
+        "id", "title", "description", "original_filename", "mime_type",
+        "content_sha256", "size_bytes", "uploaded_by", "uploaded_at", "updated_at",
+    )),
+    ProjectAccess: ("access", ("project_id", "user_id"), (
+        "project_id", "user_id", "can_read", "can_edit", "can_delete",
+    )),
+    GroupProjectAccess: ("group_access", ("project_id", "group_id"), (
+        "project_id", "group_id", "can_read", "can_edit", "can_delete",
+    )),
+    GroupMember: ("group_member", ("group_id", "user_id"), ("group_id", "user_id")),
+    Group: ("group", ("id",), ("id", "name", "parent_id")),
+    # never the password hash
+    User: ("user", ("id",), ("id", "email", "role", "can_create_projects", "is_active")),
+}
+
+# lets waiting feed requests in this process wake up as soon as we commit
+_committed = threading.Condition()
+
+
+def _json_value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def _actor_id():
+    if not has_request_context():
+        return None
+    claims = getattr(g, "_jwt_extended_jwt", None) or {}
+    sub = claims.get("sub")
+    return int(sub) if sub and str(sub).isdigit() else None
+
+
+def record(entity: str, key, op: str, data: dict = None, session=None) -> None:
+    """Queue one entry for the current transaction (for writes that bypass the ORM)."""
+    session = session or db.session
+    key = key if isinstance(key, (tuple, list)) else (key,)
+    session.info.setdefault("change_log", []).append({
+        "entity": entity,
+        "entity_id": ":".join(str(k) for k in key),
+        "op": op,
+        "data": {k: _json_value(v) for k, v in (data or {}).items()},
+        "actor_id": _actor_id(),
+    })
+
+
+# -----------------------------
+# SESSION EVENTS
+# -----------------------------
+
+def _changed(state, columns) -> bool:
+    for name in columns:
+        history = state.attrs[name].history
+        if history.has_changes() and list(history.added) != list(history.deleted):
+            return True
+    return False
+
+
+def _after_flush(session, flush_context):
+    for op, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            spec = TRACKED.get(type(obj))
+            if spec is None:
+                continue
+            entity, key_cols, columns = spec
+            state = inspect(obj)
+            if op == "update" and not _changed(state, columns):
+                continue
+            key = tuple(getattr(obj, c) for c in key_cols)
+            data = None if op == "delete" else {c: getattr(obj, c) for c in columns}
+            record(entity, key, op, data, session=session)
+
+
+def _before_commit(session):
+    if session.info.get("change_log") is None and not (session.new or session.dirty or session.deleted):
+        return
+    session.flush()
+    entries = session.info.pop("change_log", None)
+    if not entries:
+        return
+    # no seq yet: assign_seqs() numbers them once this transaction is below the watermark
+    session.execute(db.insert(ChangeLog), entries)
+    session.info["change_log_written"] = True
+
+
+def _after_commit(session):
+    if session.info.pop("change_log_written", False):
+        with _committed:
+            _committed.notify_all()
+
+
+def _after_rollback(session):
+    session.info.pop("change_log", None)
+    session.info.pop("change_log_written", None)
+
+
+_registered = False
+
+
+def init_change_log(app):
+    global _registered
+    if not _registered:
+        event.listen(RoutingSession, "after_flush", _after_flush)
+        event.listen(RoutingSession, "before_commit", _before_commit)
+        event.listen(RoutingSession, "after_commit", _after_commit)
+        event.listen(RoutingSession, "after_rollback", _after_rollback)
+        _registered = True
+
+
+# -----------------------------
+# SEQUENCING
+# -----------------------------
+
+def _assign_batch():
+    # oldest transaction still in flight for this statement's snapshot
+    xmin = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+    pending = (
+        select(ChangeLog.id)
+        .where(ChangeLog.seq.is_(None), ChangeLog.txid < xmin)
+        .order_by(ChangeLog.txid, ChangeLog.id)
+        .limit(ASSIGN_BATCH)
+        .subquery()
+    )
+    numbered = select(pending.c.id, _SEQ.next_value().label("seq")).cte("numbered")
+    return (
+        db.update(ChangeLog)
+        .where(ChangeLog.id == numbered.c.id)
+        .values(seq=numbered.c.seq)
+    )
+
+
+def assign_seqs() -> int:
+    """
+    Give seqs to the entries of every transaction below the visibility
+    watermark, in transaction order. Returns how many were numbered; 0 when
+    another process holds the lock (the next read picks its work up).
+    """
+    assigned = 0
+    with db.engine.begin() as conn:
+        if not conn.execute(select(func.pg_try_advisory_xact_lock(literal(_LOCK_KEY)))).scalar():
+            return 0
+        while True:
+            batch = conn.execute(_assign_batch()).rowcount
+            assigned += batch
+            if batch < ASSIGN_BATCH:
+                break
+    return assigned
+
+
+# -----------------------------
+# READING
+# -----------------------------
+
+def read_changes(since: int, limit: int) -> list:
+    assign_seqs()
+    rows = (
+        db.session.query(ChangeLog)
+        .filter(ChangeLog.seq > since)
+        .order_by(ChangeLog.seq)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "seq": r.seq,
+            "entity": r.entity,
+            "id": r.entity_id,
+            "op": r.op,
+            "data": r.data,
+            "actor_id": r.actor_id,
+            "at": r.created_at.isoformat(),
+        }
+        for r in rows
+    ]
+
+
+# entities whose changes can alter effective access; the rest can't affect perm_cache
+_USER_SCOPED = ("access", "group_member", "user")
+_GLOBAL = ("group", "group_access")
+
+_synced = {"seq": None, "at": 0.0}
+_sync_lock = threading.Lock()
+
+
+def sync_perm_cache(interval: float) -> None:
+    """
+    Bump perm_cache for access changes committed by any process (job
+    workers, other web workers) since the last call; runs at most once per
+    interval. Always reads the primary.
+    """
+    if time.monotonic() - _synced["at"] < interval:
+        return
+    # one thread per process syncs; the others go on with what the cache has
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        primary = {"bind": db.engine}
+        assign_seqs()
+        if _synced["seq"] is None:
+            # nothing cached yet in this process: start from the head
+            _synced["seq"] = db.session.execute(
+                select(func.coalesce(func.max(ChangeLog.seq), 0)), bind_arguments=primary
+            ).scalar()
+        else:
+            rows = db.session.execute(
+                select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+                .where(
+                    ChangeLog.seq > _synced["seq"],
+                    ChangeLog.entity.in_(_USER_SCOPED + _GLOBAL + ("project",)),
+                )
+                .order_by(ChangeLog.seq),
+                bind_arguments=primary,
+            ).all()
+            users = set()
+            for _, entity, entity_id, op in rows:
+                if entity in _USER_SCOPED:
+                    # "user_id" or "<project|group>_id:user_id"
+                    users.add(int(entity_id.rsplit(":", 1)[-1]))
+                elif entity in _GLOBAL or op == "delete":
+                    perm_cache.bump_all()
+            if users:
+                perm_cache.bump_user(*users)
+            if rows:
+                _synced["seq"] = rows[-1].seq
+        _synced["at"] = time.monotonic()
+    finally:
+        _sync_lock.release()
+
+
+def wait_for_commit(timeout: float) -> None:
+    """Sleep up to timeout; returns early when this process commits a change."""
+    with _committed:
+        _committed.wait(timeout)
+
+
+# -----------------------------
+# COMPACTION
+# -----------------------------
+
+def compact(older_than: float) -> dict:
+    """
+    Delete entries older than older_than seconds that have a newer entry for
+    the same entity. The newest entry per entity (tombstones included) stays.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    horizon = db.session.query(func.max(ChangeLog.seq)).filter(ChangeLog.created_at < cutoff).scalar()
+    deleted = 0
+    if horizon is not None:
+        newer = aliased(ChangeLog)
+        superseded = (
+            select(ChangeLog.seq)
+            .where(
+                ChangeLog.seq <= horizon,
+                select(newer.seq)
+                .where(
+                    newer.entity == ChangeLog.entity,
+                    newer.entity_id == ChangeLog.entity_id,
+                    newer.seq > ChangeLog.seq,
+                )
+                .exists(),
+            )
+            .limit(COMPACT_BATCH)
+        )
+        while True:
+            batch = db.session.execute(
+                db.delete(ChangeLog).where(ChangeLog.seq.in_(superseded))
+            ).rowcount
+            db.session.commit()
+            deleted += batch
+            if batch < COMPACT_BATCH:
+                break
+    return {"deleted": deleted, "horizon_seq": horizon}
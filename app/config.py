@@ -7,6 +7,28 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # connection pool, per worker process (see app/db_pool.py)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # test connections on checkout, so a Postgres restart costs one retry instead of a 500
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    # connections opened in the background on a process's first request; 0 disables
+    DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "0"))
+    # per-statement timeout sent at connect time; 0 disables
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    # psycopg 3: prepare server-side after N executions; -1 never prepares (needed behind pgbouncer in transaction mode)
+    DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+
+    # read replicas for @read_only routes (see app/db_routing.py); comma separated, empty = none
+    DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+    # after a write, that client reads from the primary for this many seconds
+    REPLICA_RYW_WINDOW = float(os.getenv("REPLICA_RYW_WINDOW", "5"))
+    # replicas further behind than this are skipped
+    REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+    REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me")
 
     JWT_TOKEN_LOCATION = ["cookies"]
@@ -16,5 +38,126 @@ class Config:
     JWT_ACCESS_COOKIE_PATH = "/"
     JWT_CSRF_CHECK_FORM = True
     JWT_CSRF_METHODS = ["POST", "PUT", "PATCH", "DELETE"]
+    # per-process cache of already verified tokens (see app/token_cache.py); 0 disables it
+    JWT_VERIFY_CACHE_SIZE = int(os.getenv("JWT_VERIFY_CACHE_SIZE", "4096"))
+
+    # Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+    # Hashes made with other parameters are upgraded on the next successful login.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # KDF runs at most this many at once per process; this many more may wait, the rest get 503
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+    # token-bucket rate limits (see app/ratelimit.py). "scope:count/period", comma separated;
+    # scopes: ip, user (JWT identity), email (login form). Empty string disables a limit.
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "1") == "1"
+    # "shm" shares counters between all workers on the host; "memory" is per process;
+    # a redis:// URL shares them between hosts (needs the redis package)
+    RATELIMIT_STORAGE = os.getenv("RATELIMIT_STORAGE", "shm")
+    RATELIMIT_SHM_PATH = os.getenv(
+        "RATELIMIT_SHM_PATH",
+        "/dev/shm/rbac_app_ratelimit" if os.path.isdir("/dev/shm") else "/tmp/rbac_app_ratelimit",
+    )
+    RATELIMIT_SHM_SLOTS = int(os.getenv("RATELIMIT_SHM_SLOTS", "65536"))
+    # keys the slot hash of the shm store; defaults to JWT_SECRET_KEY
+    RATELIMIT_HASH_KEY = os.getenv("RATELIMIT_HASH_KEY")
+    # number of reverse proxies in front of the app (1 behind deploy/nginx.conf); their
+    # X-Forwarded-For/-Proto are trusted, so "ip" limits see the real client address
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+    RATELIMITS = {
+        "login": os.getenv("RATELIMIT_LOGIN", "ip:30/minute,email:10/minute"),
+        "download": os.getenv("RATELIMIT_DOWNLOAD", "ip:1200/minute,user:600/minute"),
+    }
 
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "app/uploads")
+
+    # startup profile (see create_app): which blueprints to serve, and whether to import
+    # them on the first request instead of at startup
+    APP_BLUEPRINTS = os.getenv("APP_BLUEPRINTS", "auth,admin,user,api")
+    APP_LAZY_BLUEPRINTS = os.getenv("APP_LAZY_BLUEPRINTS", "0") == "1"
+    # Flask-Migrate is only set up for `flask db ...`; force it on for other entry points
+    LOAD_MIGRATE = os.getenv("LOAD_MIGRATE", "0") == "1"
+
+    # create DEFAULT_ADMIN_EMAIL in create_app() (one worker wins an advisory lock, the rest
+    # skip). Off by default: run `flask bootstrap` after `flask db upgrade` instead.
+    BOOTSTRAP_ON_STARTUP = os.getenv("BOOTSTRAP_ON_STARTUP", "0") == "1"
+
+    # hard cap per request body (form upload, raw stream upload, or one part)
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(512 * 1024 * 1024)))
+    # cap on an assembled multi-part upload
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", str(20 * 1024 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+    # storage backend class (see app/storage.py)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "app.storage.LocalBlobStorage")
+
+    # "app": stream bytes from the worker
+    # "x-accel": nginx X-Accel-Redirect to X_ACCEL_PREFIX + storage key (see deploy/nginx.conf)
+    # "x-sendfile": X-Sendfile with the absolute blob path (Apache/lighttpd)
+    FILE_DELIVERY_MODE = os.getenv("FILE_DELIVERY_MODE", "app").lower()
+    X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/_protected/")
+    # dev only: resolve X-Accel-Redirect/X-Sendfile in-process when no proxy is in front
+    FILE_DELIVERY_EMULATE = os.getenv("FILE_DELIVERY_EMULATE", "0") == "1"
+
+    # ASGI serving mode (asgi.py): threads for request handling and file reads; the
+    # transfers themselves wait on the event loop. Request bodies are streamed to
+    # the app through a queue of at most ASGI_BODY_QUEUE received chunks.
+    ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+    ASGI_BODY_QUEUE = int(os.getenv("ASGI_BODY_QUEUE", "16"))
+    # long-lived responses (change feed long-poll/SSE) get their own threads, so idle
+    # subscribers can't starve ASGI_THREADS; beyond the limit they get a 503
+    ASGI_STREAM_THREADS = int(os.getenv("ASGI_STREAM_THREADS", "16"))
+    ASGI_STREAM_PATHS = os.getenv("ASGI_STREAM_PATHS", "/api/v1/changes")
+
+    # per-request SQL count / DB time / render time, exported at /admin/metrics
+    REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "1") == "1"
+    # add a Server-Timing header (visible in the browser devtools) to every response
+    SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "0") == "1"
+    # log a likely N+1 when one request runs the same SQL this many times
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+    # rows per page on the admin projects/users tabs (keyset paginated)
+    DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "25"))
+
+    # per-process (user_id, project_id) permission cache; 0 size disables it
+    PERM_CACHE_SIZE = int(os.getenv("PERM_CACHE_SIZE", "10000"))
+    PERM_CACHE_TTL = float(os.getenv("PERM_CACHE_TTL", "5"))
+    # how often each process applies access changes made by other processes (change log)
+    PERM_CACHE_SYNC_INTERVAL = float(os.getenv("PERM_CACHE_SYNC_INTERVAL", "1"))
+    # rendered project rows on the user home page (entries); 0 disables it
+    FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "20000"))
+
+    # JSON API (/api/v1): default and max rows per page, max ids= per batch read
+    API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "100"))
+    API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+    API_MAX_IDS = int(os.getenv("API_MAX_IDS", "1000"))
+
+    # change feed (/api/v1/changes): long-poll wait, SSE poll and stream length, max entries per read
+    CHANGE_FEED_MAX_WAIT = float(os.getenv("CHANGE_FEED_MAX_WAIT", "30"))
+    CHANGE_FEED_POLL = float(os.getenv("CHANGE_FEED_POLL", "1"))
+    CHANGE_FEED_STREAM_SECONDS = float(os.getenv("CHANGE_FEED_STREAM_SECONDS", "300"))
+    CHANGE_FEED_MAX_LIMIT = int(os.getenv("CHANGE_FEED_MAX_LIMIT", "1000"))
+
+    # max (project, user) rows accepted by POST /admin/access/bulk
+    BULK_ACCESS_MAX_ROWS = int(os.getenv("BULK_ACCESS_MAX_ROWS", "50000"))
+
+    # background jobs (worker.py)
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    # a running job whose locked_at is older than this is taken back from its worker;
+    # the worker refreshes locked_at every JOB_HEARTBEAT_INTERVAL while the job runs
+    JOB_STALE_TIMEOUT = float(os.getenv("JOB_STALE_TIMEOUT", "900"))
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "60"))
+    STORAGE_GC_INTERVAL = float(os.getenv("STORAGE_GC_INTERVAL", "3600"))
+    # files younger than this are never collected
+    STORAGE_GC_GRACE = float(os.getenv("STORAGE_GC_GRACE", "3600"))
+    UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(7 * 24 * 3600)))
+    # superseded change_log entries older than this are compacted away
+    CHANGE_LOG_COMPACT_AFTER = float(os.getenv("CHANGE_LOG_COMPACT_AFTER", str(7 * 24 * 3600)))
+    CHANGE_LOG_COMPACT_INTERVAL = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", "3600"))
+
+    # file content indexing (app/text_index.py), done by worker.py
+    TEXT_EXTRACT_WORKERS = int(os.getenv("TEXT_EXTRACT_WORKERS", "2"))
+    TEXT_CHUNK_CHARS = int(os.getenv("TEXT_CHUNK_CHARS", "4000"))
+    # stop after this much text per file
+    TEXT_EXTRACT_MAX_CHARS = int(os.getenv("TEXT_EXTRACT_MAX_CHARS", str(5 * 1000 * 1000)))
@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._metrics_lock:
+                self.metrics["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._metrics_lock:
+                self.metrics["checkouts"] += 1
+                self.metrics["wait_seconds_total"] += waited
+                self.metrics["wait_seconds_max"] = max(self.metrics["wait_seconds_max"], waited)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting from where we were
+        pool = super().recreate()
+        pool.metrics = dict(self.metrics)
+        return pool
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            stats = dict(self.metrics)
+        capacity = self.size() + self._max_overflow
+        stats.update(
+            size=self.size(),
+            max_overflow=self._max_overflow,
+            checked_out=self.checkedout(),
+            idle=self.checkedin(),
+            overflow=max(self.overflow(), 0),
+            saturation=round(self.checkedout() / capacity, 3) if capacity > 0 else None,
+        )
+        return stats
+
+
+def engine_options(config, uri: str) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings in Config."""
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+    if uri.startswith("postgresql"):
+        connect_args = {}
+        if config["DB_STATEMENT_TIMEOUT_MS"]:
+            connect_args["options"] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        if uri.startswith("postgresql+psycopg:"):
+            # psycopg 3 prepares a statement server-side after this many executions
+            threshold = config["DB_PREPARE_THRESHOLD"]
+            connect_args["prepare_threshold"] = threshold if threshold >= 0 else None
+        options["connect_args"] = connect_args
+    return options
+
+
+def prewarm(engine, count: int) -> int:
+    """Open count connections at once and return them to the pool."""
+    count = min(count, engine.pool.size())
+    if count <= 0:
+        return 0
+    try:
+        with ThreadPoolExecutor(max_workers=count) as ex:
+            conns = list(ex.map(lambda _: engine.connect(), range(count)))
+    except exc.DBAPIError as e:
+        # database not up yet: start anyway, the pool fills on demand
+        log.warning("pool prewarm skipped: %s", e.orig)
+        return 0
+    for conn in conns:
+        conn.close()
+    return len(conns)
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
@@ -0,0 +1,170 @@
+import itertools
+import logging
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql.util import find_tables
+
+log = logging.getLogger(__name__)
+
+# Replicas are ordinary Flask-SQLAlchemy binds named replica_0, replica_1, ...
+# (built from DATABASE_REPLICA_URLS). No model is bound to them; RoutingSession
+# sends a query there only when the route is marked @read_only, nothing is
+# being flushed, the client has not written recently, and every table the
+# query reads is in REPLICA_TABLES.
+#
+# Authorization data (users, grants, groups, effective_access) is always read
+# on the primary: a lagging replica would otherwise hand back a revoked grant,
+# and project_perm would cache it again right after the revoke bumped the
+# cache.
+
+REPLICA_PREFIX = "replica_"
+REPLICA_TABLES = frozenset({"documents", "blobs", "blob_text_chunks"})
+
+_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replica_binds(config, urls, engine_options) -> dict:
+    """SQLALCHEMY_BINDS entries for the replica URLs, with the primary's pool settings."""
+    return {
+        f"{REPLICA_PREFIX}{i}": dict(engine_options(config, url), url=url)
+        for i, url in enumerate(u.strip() for u in urls.split(",") if u.strip())
+    }
+
+
+def replica_safe(mapper=None, clause=None) -> bool:
+    """True when the statement reads only REPLICA_TABLES (raw SQL never is)."""
+    tables = set()
+    if clause is not None:
+        tables.update(find_tables(clause, check_columns=True, include_crud=True))
+    if mapper is not None:
+        tables.update(mapper.tables)
+    names = {getattr(t, "name", None) for t in tables}
+    return bool(names) and names <= REPLICA_TABLES
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            router = current_app.extensions.get("replica_router")
+            engine = router.engine_for_request(mapper, clause) if router else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Health-checked round robin over the replica binds.
+
+    A replica is skipped when the last check failed, its replay lag was
+    above REPLICA_MAX_LAG, or a query on it raised a connection error; it
+    is checked again after REPLICA_HEALTH_INTERVAL seconds. With no healthy
+    replica everything goes to the primary.
+    """
+
+    def __init__(self):
+        self.cookie_name = "db_primary_until"
+        self.ryw_window = 5.0
+        self.max_lag = 5.0
+        self.interval = 5.0
+        self._state = {}
+        self._rr = itertools.count()
+        self._checked_at = 0.0
+        self._check_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ryw_window = app.config.get("REPLICA_RYW_WINDOW", self.ryw_window)
+        self.max_lag = app.config.get("REPLICA_MAX_LAG", self.max_lag)
+        self.interval = app.config.get("REPLICA_HEALTH_INTERVAL", self.interval)
+        keys = sorted(k for k in app.config.get("SQLALCHEMY_BINDS", {}) if k.startswith(REPLICA_PREFIX))
+        self._state = {k: {"healthy": True, "lag": None, "routed": 0, "errors": 0} for k in keys}
+        app.extensions["replica_router"] = self
+        if not keys:
+            return
+
+        with app.app_context():
+            engines = current_app.extensions["sqlalchemy"].engines
+            for key in keys:
+                event.listen(engines[key], "handle_error", self._on_error(key))
+
+        app.after_request(self._remember_write)
+
+    # -----------------------------
+    # ROUTING
+    # -----------------------------
+
+    def engine_for_request(self, mapper=None, clause=None):
+        if not self._state or not g.get("db_read_only"):
+            return None
+        if not replica_safe(mapper, clause):
+            return None
+        # read-your-writes: this client wrote recently, stay on the primary
+        try:
+            if float(request.cookies.get(self.cookie_name, 0)) > time.time():
+                return None
+        except ValueError:
+            pass
+
+        self._maybe_check()
+        healthy = [k for k, s in self._state.items() if s["healthy"]]
+        if not healthy:
+            return None
+        key = healthy[next(self._rr) % len(healthy)]
+        self._state[key]["routed"] += 1
+        return current_app.extensions["sqlalchemy"].engines[key]
+
+    def _remember_write(self, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            until = time.time() + self.ryw_window
+            response.set_cookie(
+                self.cookie_name, f"{until:.3f}", max_age=int(self.ryw_window) + 1,
+                httponly=True, samesite="Lax",
+            )
+        return response
+
+    # -----------------------------
+    # HEALTH
+    # -----------------------------
+
+    def _maybe_check(self):
+        if time.monotonic() - self._checked_at < self.interval:
+            return
+        # one thread per process checks; the others keep routing on the last result
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            engines = current_app.extensions["sqlalchemy"].engines
+            for key, state in self._state.items():
+                try:
+                    with engines[key].connect() as conn:
+                        lag = float(conn.execute(_LAG_SQL).scalar() or 0)
+                    state["lag"] = lag
+                    state["healthy"] = lag <= self.max_lag
+                except Exception as e:
+                    state["healthy"] = False
+                    state["errors"] += 1
+                    log.warning("replica %s failed health check: %s", key, e)
+            self._checked_at = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def _on_error(self, key):
+        def handle_error(ctx):
+            if ctx.is_disconnect:
+                self._state[key]["healthy"] = False
+                self._state[key]["errors"] += 1
+                # recheck at the next interval instead of waiting for a full one
+                self._checked_at = min(self._checked_at, time.monotonic() - self.interval / 2)
+        return handle_error
+
+    def stats(self) -> dict:
+        return {k: dict(s) for k, s in self._state.items()}
@@ -0,0 +1,191 @@
+import os
+import uuid
+from urllib.parse import quote
+from flask import request, abort, current_app, Response
+from werkzeug.http import http_date, is_resource_modified, parse_if_range_header
+from werkzeug.wsgi import wrap_file
+
+from .storage import get_storage
+
+READ_CHUNK = 64 * 1024
+
+# more ranges than this in one request is served as a plain 200 (RFC 9110 allows it)
+MAX_RANGES = 16
+
+
+def send_document(doc):
+    """
+    Download response for a Document after the caller has checked access.
+
+    Validators come from the row (content hash + upload time), so
+    If-None-Match / If-Modified-Since are answered with 304 before the blob is
+    even opened. Single and multiple byte ranges are supported.
+    """
+    sha256 = doc.content_sha256
+    if not sha256:
+        abort(404)
+
+    last_modified = doc.uploaded_at
+    headers = {
+        "ETag": f'"{sha256}"',
+        "Accept-Ranges": "bytes",
+        # access can be revoked at any time: caches must revalidate with us
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": _content_disposition(doc.original_filename),
+    }
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if not is_resource_modified(
+        request.environ, etag=sha256, last_modified=last_modified, ignore_if_range=True
+    ):
+        headers.pop("Content-Disposition")
+        return Response(status=304, headers=headers)
+
+    storage = get_storage()
+    if not storage.exists(sha256):
+        abort(404)
+
+    mimetype = doc.mime_type or "application/octet-stream"
+
+    mode = current_app.config["FILE_DELIVERY_MODE"]
+    if mode != "app":
+        # access is already checked; the proxy streams the bytes (and handles Range)
+        return _offload(mode, storage, sha256, headers, mimetype)
+
+    size = doc.size_bytes
+    if size is None:
+        with storage.open(sha256) as f:
+            size = f.seek(0, os.SEEK_END)
+
+    ranges = _requested_ranges(size, sha256, last_modified)
+    if ranges == "unsatisfiable":
+        headers.pop("Content-Disposition")
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status=416, headers=headers)
+
+    if not ranges:
+        f = storage.open(sha256)
+        headers["Content-Length"] = str(size)
+        # wsgi.file_wrapper lets the server use sendfile() for the full body
+        return Response(
+            wrap_file(request.environ, f, READ_CHUNK),
+            status=200, headers=headers, mimetype=mimetype, direct_passthrough=True,
+        )
+
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        headers["Content-Length"] = str(stop - start)
+        return Response(
+            _read_ranges(storage, sha256, ranges),
+            status=206, headers=headers, mimetype=mimetype, direct_passthrough=True,
+        )
+
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            (
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {mimetype}\r\n"
+                f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+            ).encode("latin-1"),
+            (start, stop),
+        )
+        for start, stop in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    headers["Content-Length"] = str(
+        sum(len(head) + (stop - start) for head, (start, stop) in parts) + len(closing)
+    )
+    return Response(
+        _read_multipart(storage, sha256, parts, closing),
+        status=206, headers=headers,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+        direct_passthrough=True,
+    )
+
+
+def _offload(mode: str, storage, sha256: str, headers: dict, mimetype: str):
+    headers.pop("Accept-Ranges")
+    if mode == "x-accel":
+        prefix = current_app.config["X_ACCEL_PREFIX"].rstrip("/")
+        headers["X-Accel-Redirect"] = f"{prefix}/{storage.key(sha256)}"
+    elif mode == "x-sendfile":
+        path = storage.path(sha256)
+        if path is None:
+            abort(500)
+        headers["X-Sendfile"] = path
+    else:
+        raise RuntimeError(f"unknown FILE_DELIVERY_MODE {mode!r}")
+    return Response(status=200, headers=headers, mimetype=mimetype)
+
+
+def _content_disposition(filename: str) -> str:
+    ascii_name = filename.encode("ascii", "ignore").decode("ascii").replace('"', "") or "download"
+    value = f'attachment; filename="{ascii_name}"'
+    if ascii_name != filename:
+        value += f"; filename*=UTF-8''{quote(filename)}"
+    return value
+
+
+def _requested_ranges(size: int, etag: str, last_modified):
+    """
+    [(start, stop), ...] with stop exclusive, [] for "send everything", or
+    "unsatisfiable".
+    """
+    rng = request.range
+    if rng is None or rng.units != "bytes":
+        return []
+
+    if_range = parse_if_range_header(request.headers.get("If-Range"))
+    if if_range.etag is not None and if_range.etag != etag:
+        return []
+    if if_range.date is not None and (
+        last_modified is None or last_modified.replace(microsecond=0) > if_range.date.replace(tzinfo=None)
+    ):
+        return []
+
+    ranges = []
+    for start, stop in rng.ranges:
+        if start < 0:
+            # suffix range: last -start bytes
+            start, stop = max(size + start, 0), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+
+    if not ranges:
+        return "unsatisfiable"
+    if len(ranges) > MAX_RANGES:
+        return []
+    return ranges
+
+
+def _read_ranges(storage, sha256, ranges):
+    with storage.open(sha256) as f:
+        for start, stop in ranges:
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+
+def _read_multipart(storage, sha256, parts, closing):
+    with storage.open(sha256) as f:
+        for head, (start, stop) in parts:
+            yield head
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+    yield closing
@@ -0,0 +1,236 @@
+from flask import current_app
+from sqlalchemy import func, tuple_, select, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .extensions import db, perm_cache
+from .perm_cache import Perm, NO_ACCESS
+from .models import (
+    EffectiveAccess, Group, GroupMember, GroupProjectAccess, ProjectAccess, User,
+)
+from .change_log import sync_perm_cache
+
+BATCH = 1000
+
+# first key of the two-int advisory lock used to serialize recomputes per user
+_LOCK_NAMESPACE = 0x0EA0
+
+
+# -----------------------------
+# GROUP TREE
+# -----------------------------
+
+def ancestor_ids(group_ids) -> set:
+    """group_ids plus every parent above them."""
+    group_ids = list(group_ids)
+    if not group_ids:
+        return set()
+    tree = (
+        select(Group.id, Group.parent_id)
+        .where(Group.id.in_(group_ids))
+        .cte("ancestors", recursive=True)
+    )
+    tree = tree.union(
+        select(Group.id, Group.parent_id).join(tree, Group.id == tree.c.parent_id)
+    )
+    return {gid for (gid,) in db.session.execute(select(tree.c.id))}
+
+
+def descendant_ids(group_id: int) -> set:
+    """group_id plus every group nested below it."""
+    tree = select(Group.id).where(Group.id == group_id).cte("descendants", recursive=True)
+    tree = tree.union(select(Group.id).join(tree, Group.parent_id == tree.c.id))
+    return {gid for (gid,) in db.session.execute(select(tree.c.id))}
+
+
+# -----------------------------
+# AFFECTED PAIRS
+# -----------------------------
+# Each helper returns the (project_id, user_id) pairs whose effective access
+# can change because of one kind of edit. Call it for the state before AND
+# after the edit when the edit can also remove inheritance.
+
+def pairs_for_members(group_id: int, user_ids) -> set:
+    """User(s) joining/leaving group_id: they gain/lose its and its ancestors' grants."""
+    groups = ancestor_ids([group_id])
+    projects = {
+        pid for (pid,) in db.session.query(GroupProjectAccess.project_id)
+        .filter(GroupProjectAccess.group_id.in_(groups)).distinct()
+    }
+    return {(pid, uid) for pid in projects for uid in user_ids}
+
+
+def pairs_for_group_grant(group_id: int, project_id: int) -> set:
+    """A grant on group_id reaches members of it and of every nested group."""
+    users = {
+        uid for (uid,) in db.session.query(GroupMember.user_id)
+        .filter(GroupMember.group_id.in_(descendant_ids(group_id))).distinct()
+    }
+    return {(project_id, uid) for uid in users}
+
+
+def pairs_for_group_subtree(group_id: int) -> set:
+    """Deleting/reparenting group_id: its subtree's members x every grant they inherit through it."""
+    subtree = descendant_ids(group_id)
+    users = {
+        uid for (uid,) in db.session.query(GroupMember.user_id)
+        .filter(GroupMember.group_id.in_(subtree)).distinct()
+    }
+    groups = subtree | ancestor_ids([group_id])
+    projects = {
+        pid for (pid,) in db.session.query(GroupProjectAccess.project_id)
+        .filter(GroupProjectAccess.group_id.in_(groups)).distinct()
+    }
+    return {(pid, uid) for pid in projects for uid in users}
+
+
+# -----------------------------
+# RECOMPUTE
+# -----------------------------
+
+def recompute_pairs(pairs) -> int:
+    """
+    Rebuild effective_access for exactly these (project_id, user_id) pairs,
+    inside the caller's transaction. Returns the number of pairs touched.
+    Caller commits, then bumps the perm cache for the returned users via
+    bump_users(pairs).
+    """
+    pairs = sorted(set(pairs), key=lambda p: (p[1], p[0]))
+    if not pairs:
+        return 0
+
+    # serialize concurrent recomputes for the same users (sorted: no deadlocks)
+    for uid in sorted({u for _, u in pairs}):
+        db.session.execute(select(func.pg_advisory_xact_lock(literal(_LOCK_NAMESPACE), uid)))
+
+    for start in range(0, len(pairs), BATCH):
+        _recompute_batch(pairs[start:start + BATCH])
+    return len(pairs)
+
+
+def _recompute_batch(pairs):
+    flags = {pair: [False, False, False] for pair in pairs}
+
+    def merge(pair, can_read, can_edit, can_delete):
+        f = flags[pair]
+        # any grant implies read
+        f[0] = f[0] or can_read or can_edit or can_delete
+        f[1] = f[1] or can_edit
+        f[2] = f[2] or can_delete
+
+    # direct grants
+    direct = (
+        db.session.query(
+            ProjectAccess.project_id, ProjectAccess.user_id,
+            ProjectAccess.can_read, ProjectAccess.can_edit, ProjectAccess.can_delete,
+        )
+        .filter(tuple_(ProjectAccess.project_id, ProjectAccess.user_id).in_(pairs))
+    )
+    for pid, uid, r, e, d in direct:
+        merge((pid, uid), r, e, d)
+
+    # inherited grants: user -> direct groups -> ancestors -> group grants
+    user_ids = {u for _, u in pairs}
+    project_ids = {p for p, _ in pairs}
+    memberships = {}
+    for gid, uid in (
+        db.session.query(GroupMember.group_id, GroupMember.user_id)
+        .filter(GroupMember.user_id.in_(user_ids))
+    ):
+        memberships.setdefault(uid, set()).add(gid)
+
+    if memberships:
+        parents = dict(db.session.query(Group.id, Group.parent_id).filter(
+            Group.id.in_(ancestor_ids(set().union(*memberships.values())))
+        ))
+        grants = {}
+        for gid, pid, r, e, d in (
+            db.session.query(
+                GroupProjectAccess.group_id, GroupProjectAccess.project_id,
+                GroupProjectAccess.can_read, GroupProjectAccess.can_edit,
+                GroupProjectAccess.can_delete,
+            )
+            .filter(
+                GroupProjectAccess.project_id.in_(project_ids),
+                GroupProjectAccess.group_id.in_(parents.keys()),
+            )
+        ):
+            grants.setdefault(gid, []).append((pid, r, e, d))
+
+        for uid, direct_groups in memberships.items():
+            for gid in _with_ancestors(direct_groups, parents):
+                for pid, r, e, d in grants.get(gid, ()):
+                    if (pid, uid) in flags:
+                        merge((pid, uid), r, e, d)
+
+    # deletion queued: their grants still exist until the job runs, but give nothing
+    inactive = {
+        uid for (uid,) in db.session.query(User.id)
+        .filter(User.id.in_(user_ids), User.is_active.is_(False))
+    }
+    for (pid, uid), f in flags.items():
+        if uid in inactive:
+            f[0] = False
+
+    keep = [
+        {"project_id": pid, "user_id": uid, "can_read": True, "can_edit": f[1], "can_delete": f[2]}
+        for (pid, uid), f in flags.items() if f[0]
+    ]
+    drop = [pair for pair, f in flags.items() if not f[0]]
+
+    if keep:
+        stmt = pg_insert(EffectiveAccess).values(keep)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[EffectiveAccess.user_id, EffectiveAccess.project_id],
+            set_={
+                "can_read": True,
+                "can_edit": stmt.excluded.can_edit,
+                "can_delete": stmt.excluded.can_delete,
+            },
+        ))
+    if drop:
+        db.session.execute(
+            db.delete(EffectiveAccess)
+            .where(tuple_(EffectiveAccess.project_id, EffectiveAccess.user_id).in_(drop))
+        )
+
+
+def _with_ancestors(group_ids, parents: dict) -> set:
+    seen = set()
+    stack = list(group_ids)
+    while stack:
+        gid = stack.pop()
+        if gid in seen or gid not in parents:
+            continue
+        seen.add(gid)
+        if parents[gid] is not None:
+            stack.append(parents[gid])
+    return seen
+
+
+def project_perm(user_id: int, project_id: int):
+    """The user's Perm on a project, through perm_cache."""
+    sync_perm_cache(current_app.config["PERM_CACHE_SYNC_INTERVAL"])
+    perm = perm_cache.get(user_id, project_id)
+    if perm is None:
+        generation = perm_cache.generation(user_id)
+        row = (
+            db.session.query(
+                EffectiveAccess.can_read, EffectiveAccess.can_edit, EffectiveAccess.can_delete
+            )
+            .filter_by(project_id=project_id, user_id=user_id)
+            .first()
+        )
+        perm = Perm(*row) if row else NO_ACCESS
+        perm_cache.put(user_id, project_id, perm, generation)
+    return perm
+
+
+def users_with_access(project_id: int) -> list:
+    return [
+        uid for (uid,) in db.session.query(EffectiveAccess.user_id)
+        .filter(EffectiveAccess.project_id == project_id)
+    ]
+
+
+def bump_users(pairs) -> None:
+    perm_cache.bump_user(*{u for _, u in pairs})
@@ -1,7 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
+from .db_routing import RoutingSession, ReplicaRouter
+from .perm_cache import PermissionCache
+from .token_cache import TokenCache
+from .fragment_cache import FragmentCache
+from .auth.passwords import PasswordHasher
+from .ratelimit import RateLimiter
+from .request_metrics import RequestMetrics
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 jwt = JWTManager()
+perm_cache = PermissionCache()
+token_cache = TokenCache()
+fragment_cache = FragmentCache()
+password_hasher = PasswordHasher()
+limiter = RateLimiter()
+replica_router = ReplicaRouter()
+request_metrics = RequestMetrics()
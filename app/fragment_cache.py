@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """
+    In-process LRU of rendered HTML fragments.
+
+    Callers put everything the fragment depends on into the key (row id and
+    version, the viewer's permission flags, ...), so an entry never has to be
+    invalidated: a change produces a different key and the old entry simply
+    ages out. That also makes it safe across worker processes.
+    """
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_size = app.config.get("FRAGMENT_CACHE_SIZE", self.max_size)
+        app.extensions["fragment_cache"] = self
+
+    def get_or_render(self, key, render):
+        """The cached fragment for key, or render() (stored for next time)."""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        # rendered outside the lock; two threads may both render a cold key
+        html = render()
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = html
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return html
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
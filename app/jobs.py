@@ -0,0 +1,222 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from .extensions import db
+from .models import Job
+
+log = logging.getLogger(__name__)
+
+_HANDLERS = {}
+
+
+def job_handler(kind: str):
+    """Register fn(payload: dict) -> JSON-able result for a job kind."""
+    def register(fn):
+        _HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind: str, payload=None, max_attempts: int = 5, delay: float = 0) -> Job:
+    """
+    Add a job to the current session. It becomes visible to workers when the
+    caller commits, so it is atomic with whatever change produced it.
+    """
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(job)
+    return job
+
+
+def claim_next(worker_id: str):
+    """Lock one due job, mark it running and commit. None when the queue is empty."""
+    job = (
+        Job.query
+        .filter(Job.status == "queued", Job.run_after <= datetime.utcnow())
+        .order_by(Job.run_after, Job.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.locked_at = datetime.utcnow()
+    job.locked_by = worker_id
+    db.session.commit()
+    return job
+
+
+class _Heartbeat:
+    """
+    Refreshes locked_at from a side thread while a handler runs, so
+    requeue_stale() only takes back jobs whose worker has actually gone away,
+    not ones that simply run longer than JOB_STALE_TIMEOUT.
+    """
+
+    def __init__(self, engine, job_id: int, worker_id: str, interval: float):
+        self.engine = engine
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-{job_id}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        jobs = Job.__table__
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        jobs.update()
+                        .where(jobs.c.id == self.job_id, jobs.c.locked_by == self.worker_id,
+                               jobs.c.status == "running")
+                        .values(locked_at=datetime.utcnow())
+                    )
+            except Exception:
+                log.warning("job %s heartbeat failed", self.job_id, exc_info=True)
+
+
+def _owned(job_id: int, worker_id: str):
+    """The job row, locked, if this worker still holds it; None after a requeue."""
+    job = db.session.get(Job, job_id, with_for_update=True, populate_existing=True)
+    if job is None or job.status != "running" or job.locked_by != worker_id:
+        db.session.rollback()
+        log.warning("job %s was taken back from %s while running; result dropped", job_id, worker_id)
+        return None
+    return job
+
+
+def run_job(job: Job, heartbeat: float = 60) -> None:
+    handler = _HANDLERS.get(job.kind)
+    job_id, worker_id = job.id, job.locked_by
+    try:
+        if handler is None:
+            raise LookupError(f"no handler for job kind {job.kind!r}")
+        with _Heartbeat(db.engine, job_id, worker_id, heartbeat):
+            result = handler(dict(job.payload or {}))
+    except Exception:
+        db.session.rollback()
+        job = _owned(job_id, worker_id)
+        if job is None:
+            return
+        job.last_error = traceback.format_exc(limit=20)
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+        else:
+            # exponential backoff: 2s, 4s, 8s, ... capped at 10 minutes
+            job.status = "queued"
+            job.run_after = datetime.utcnow() + timedelta(seconds=min(2 ** job.attempts, 600))
+        db.session.commit()
+        log.warning("job %s (%s) attempt %s failed", job_id, job.kind, job.attempts)
+        return
+
+    job = _owned(job_id, worker_id)
+    if job is None:
+        return
+    job.status = "done"
+    job.result = result
+    job.last_error = None
+    job.locked_at = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def requeue_stale(timeout: float) -> int:
+    """
+    Put back jobs whose worker died while running them (no heartbeat for
+    timeout seconds). A job that has used up its attempts fails instead, so
+    one that keeps killing its worker is not retried forever.
+    """
+    now = datetime.utcnow()
+    stale = Job.query.filter(Job.status == "running", Job.locked_at < now - timedelta(seconds=timeout))
+    failed = (
+        stale.filter(Job.attempts >= Job.max_attempts)
+        .update(
+            {
+                "status": "failed",
+                "locked_at": None,
+                "locked_by": None,
+                "finished_at": now,
+                "last_error": "worker stopped responding while running this job",
+            },
+            synchronize_session=False,
+        )
+    )
+    count = (
+        stale.filter(Job.attempts < Job.max_attempts)
+        .update({"status": "queued", "locked_at": None, "locked_by": None}, synchronize_session=False)
+    )
+    db.session.commit()
+    if failed:
+        log.warning("%s stale jobs failed after their last attempt", failed)
+    return count
+
+
+def schedule_periodic(kind: str, interval: float) -> bool:
+    """Enqueue kind unless one is pending or ran within the last interval seconds."""
+    since = datetime.utcnow() - timedelta(seconds=interval)
+    recent = (
+        db.session.query(Job.id)
+        .filter(
+            Job.kind == kind,
+            db.or_(Job.status.in_(("queued", "running")), Job.created_at > since),
+        )
+        .first()
+    )
+    if recent:
+        db.session.rollback()
+        return False
+    enqueue(kind)
+    db.session.commit()
+    return True
+
+
+def run_worker(app, poll_interval: float = None, once: bool = False) -> None:
+    """Main loop for worker.py. Several workers can run side by side."""
+    from . import tasks  # noqa: F401  (registers the handlers)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    poll_interval = poll_interval or app.config["JOB_POLL_INTERVAL"]
+
+    with app.app_context():
+        log.info("job worker %s started", worker_id)
+        last_maintenance = 0.0
+        while True:
+            now = time.monotonic()
+            if now - last_maintenance > poll_interval * 10:
+                requeue_stale(app.config["JOB_STALE_TIMEOUT"])
+                schedule_periodic("gc_storage", app.config["STORAGE_GC_INTERVAL"])
+                schedule_periodic("compact_change_log", app.config["CHANGE_LOG_COMPACT_INTERVAL"])
+                last_maintenance = now
+
+            job = claim_next(worker_id)
+            if job is not None:
+                run_job(job, app.config["JOB_HEARTBEAT_INTERVAL"])
+                db.session.remove()
+                continue
+
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -1,6 +1,6 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from .extensions import db
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from .extensions import db, password_hasher
 
 class ProjectAccess(db.Model):
     __tablename__ = "project_access"
@@ -29,13 +29,55 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        return password_hasher.needs_rehash(self.password_hash)
     
-    project_access = db.relationship("ProjectAccess", backref="user", cascade="all, delete-orphan")
+    # passive_deletes: let the FK ON DELETE CASCADE remove grants instead of loading them
+    project_access = db.relationship("ProjectAccess", backref="user", cascade="all, delete-orphan", passive_deletes=True)
     can_create_projects = db.Column(db.Boolean, nullable=False, default=False)
+    # False once deletion is queued: no login, no effective access
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+
+    __table_args__ = (
+        # keyset pagination on the admin users tab
+        db.Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
+
+class Blob(db.Model):
+    """One stored file, shared by every Document with the same content."""
+    __tablename__ = "blobs"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # content indexing (app/text_index.py): NULL, pending, done, unsupported, failed
+    text_status = db.Column(db.String(20), nullable=True)
+    text_indexed_at = db.Column(db.DateTime, nullable=True)
+
+
+class BlobTextChunk(db.Model):
+    """A slice of a blob's extracted text, searchable on its own."""
+    __tablename__ = "blob_text_chunks"
+
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey("blobs.sha256", ondelete="CASCADE"), primary_key=True)
+    chunk_no = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    search_vector = db.Column(
+        TSVECTOR,
+        db.Computed("to_tsvector('english', content)", persisted=True),
+        nullable=True,
+    )
+
+    __table_args__ = (
+        db.Index("ix_blob_text_chunks_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
 class Document(db.Model):
@@ -45,11 +87,146 @@ class Document(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
 
-    stored_filename = db.Column(db.String(500), nullable=False)   # uuid_original.ext
+    stored_filename = db.Column(db.String(500), nullable=False)   # storage key, e.g. blobs/ab/cd/<sha256>
     original_filename = db.Column(db.String(500), nullable=False)
     mime_type = db.Column(db.String(200), nullable=True)
+    content_sha256 = db.Column(db.String(64), nullable=True, index=True)
+    size_bytes = db.Column(db.BigInteger, nullable=True)
 
     uploaded_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    access_list = db.relationship("ProjectAccess", backref="project", cascade="all, delete-orphan")
+    access_list = db.relationship("ProjectAccess", backref="project", cascade="all, delete-orphan", passive_deletes=True)
+
+    # maintained by Postgres on every insert/update; title ranks above description
+    search_vector = db.Column(
+        TSVECTOR,
+        db.Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    )
+
+    __table_args__ = (
+        # keyset pagination on the admin projects tab
+        db.Index("ix_documents_updated_at_id", "updated_at", "id"),
+        # full-text search (app/search.py)
+        db.Index("ix_documents_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class Group(db.Model):
+    """
+    A set of users that can hold project grants. parent_id nests groups:
+    members of a child group also get every grant of its ancestors.
+    """
+    __tablename__ = "groups"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # keyset pagination on the admin groups tab
+        db.Index("ix_groups_created_at_id", "created_at", "id"),
+    )
+
+
+class GroupMember(db.Model):
+    __tablename__ = "group_members"
+
+    group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GroupProjectAccess(db.Model):
+    __tablename__ = "group_project_access"
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
+    can_read = db.Column(db.Boolean, nullable=False, default=True)
+    can_edit = db.Column(db.Boolean, nullable=False, default=False)
+    can_delete = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("project_id", "group_id", name="uq_project_group_access"),
+    )
+
+
+class EffectiveAccess(db.Model):
+    """
+    Materialized union of direct ProjectAccess and inherited group grants.
+    Maintained by effective_access.recompute_pairs(); read by the user routes.
+    """
+    __tablename__ = "effective_access"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, index=True)
+    can_read = db.Column(db.Boolean, nullable=False, default=True)
+    can_edit = db.Column(db.Boolean, nullable=False, default=False)
+    can_delete = db.Column(db.Boolean, nullable=False, default=False)
+
+
+class Job(db.Model):
+    """Background work item, claimed by worker.py with FOR UPDATE SKIP LOCKED."""
+    __tablename__ = "jobs"
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued/running/done/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # the worker's claim query: WHERE status = 'queued' AND run_after <= now ORDER BY run_after
+        db.Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+
+class ChangeLog(db.Model):
+    """
+    Append-only feed of project, access, group and user changes, written in
+    the same transaction as the change (see app/change_log.py).
+    """
+    __tablename__ = "change_log"
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    # feed position; NULL until the writing transaction is visible to every
+    # reader, then assigned in that order (see app/change_log.py)
+    seq = db.Column(db.BigInteger, nullable=True)
+    # writing transaction's id (xid8)
+    txid = db.Column(
+        db.BigInteger, nullable=False, server_default=db.text("pg_current_xact_id()::text::bigint")
+    )
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.String(64), nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # create/update/delete
+    data = db.Column(db.JSON, nullable=True)
+    # no FK: entries outlive the user who made them
+    actor_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # compaction: newer entries for the same entity
+        db.Index("ix_change_log_seq", "seq", unique=True),
+        db.Index("ix_change_log_entity", "entity", "entity_id", "seq"),
+        db.Index("ix_change_log_created_at", "created_at"),
+        # entries still waiting for a seq
+        db.Index(
+            "ix_change_log_unsequenced", "txid", "id", postgresql_where=db.text("seq IS NULL")
+        ),
+    )
@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    return f"{ts.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: str):
+    # cursor format: "<iso timestamp>_<id>" ; bad cursors just mean "first page"
+    if not cursor:
+        return None
+    ts_raw, _, id_raw = cursor.rpartition("_")
+    if not ts_raw or not id_raw.isdigit():
+        return None
+    try:
+        return datetime.fromisoformat(ts_raw), int(id_raw)
+    except ValueError:
+        return None
+
+
+def keyset_page(query, ts_col, id_col, cursor: str, limit: int):
+    """
+    Newest-first keyset pagination on (ts_col, id_col).
+    Returns (rows, next_cursor). next_cursor is None on the last page.
+    """
+    decoded = decode_cursor(cursor)
+    if decoded:
+        ts, row_id = decoded
+        # row-value comparison so Postgres can walk the composite index
+        query = query.filter(tuple_(ts_col, id_col) < tuple_(ts, row_id))
+
+    # fetch one extra row to know whether another page exists
+    rows = query.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, ts_col.key), getattr(last, id_col.key)
+        )
+    return rows, next_cursor
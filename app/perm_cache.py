@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+Perm = namedtuple("Perm", ["can_read", "can_edit", "can_delete"])
+
+NO_ACCESS = Perm(False, False, False)
+
+
+class PermissionCache:
+    """
+    In-process LRU/TTL cache of (user_id, project_id) -> Perm.
+
+    Every entry remembers the user's generation at the time it was stored.
+    Any grant/update/revoke for a user bumps that user's generation, so older
+    entries are treated as misses and never served again by this process.
+    Other processes learn about the change from the change log (see
+    change_log.sync_perm_cache) within PERM_CACHE_SYNC_INTERVAL; bump_all()
+    covers changes that can't be pinned to a few users.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_size = app.config.get("PERM_CACHE_SIZE", self.max_size)
+        self.ttl = app.config.get("PERM_CACHE_TTL", self.ttl)
+        app.extensions["perm_cache"] = self
+
+    def get(self, user_id: int, project_id: int):
+        key = (user_id, project_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, perm = entry
+                if (
+                    generation == (self._epoch, self._generations.get(user_id, 0))
+                    and expires_at > time.monotonic()
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return perm
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, user_id: int, project_id: int, perm: Perm, generation: int) -> None:
+        # generation must be read (via generation()) BEFORE the DB lookup, so a
+        # bump that races with the query leaves this entry already stale
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[(user_id, project_id)] = (
+                generation, time.monotonic() + self.ttl, perm
+            )
+            self._entries.move_to_end((user_id, project_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, user_id: int) -> tuple:
+        with self._lock:
+            return self._epoch, self._generations.get(user_id, 0)
+
+    def bump_user(self, *user_ids: int) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._epoch += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,222 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import wraps
+from flask import request, g
+from werkzeug.exceptions import TooManyRequests
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(spec: str):
+    """
+    "ip:20/minute" -> ("ip", rate per second, burst). The burst is the count,
+    so a client may spend the whole allowance at once and then refills
+    steadily.
+    """
+    scope, _, amount = spec.strip().partition(":")
+    count, _, period = amount.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if scope not in KEY_FUNCS or period not in _PERIODS:
+        raise ValueError(f"bad rate limit {spec!r}")
+    count = int(count)
+    return scope, count / _PERIODS[period], count
+
+
+def _bucket(tokens: float, last: float, now: float, rate: float, burst: int, cost: int):
+    """One token-bucket step. Returns (allowed, tokens, retry_after_seconds)."""
+    tokens = min(burst, tokens + max(now - last, 0) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+# -----------------------------
+# STORES
+# -----------------------------
+
+class MemoryStore:
+    """Buckets in this process only; fine for a single worker or dev."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1):
+        now = time.time()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            allowed, tokens, retry = _bucket(tokens, last, now, rate, burst, cost)
+            self._buckets[key] = (tokens, now)
+        return allowed, retry
+
+
+class SharedMemoryStore:
+    """
+    Buckets in a fixed-size mmap'd table shared by every worker on the host
+    (put the file on tmpfs, e.g. /dev/shm).
+
+    Each slot is (key hash, tokens, last refill). A key maps to one slot;
+    keys that collide share its bucket (never refilled on a change of
+    owner), so a collision can only make a limit stricter. The hash is keyed
+    with a per-deployment secret, so a client cannot pick an email or
+    address that lands on someone else's slot. Updates hold a byte-range
+    lock on that slot only.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path: str, slots: int = 65536, secret: str = ""):
+        self.path = path
+        self.slots = slots
+        # blake2b keys are at most 64 bytes
+        self._hash_key = hashlib.sha256(secret.encode()).digest()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._lock = threading.Lock()  # fcntl locks are per process, not per thread
+
+    def _open(self):
+        import fcntl  # POSIX only; MemoryStore works everywhere
+
+        self._fcntl = fcntl
+        size = self.slots * self.SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._map = mmap.mmap(fd, size)
+        self._fd = fd
+        self._pid = os.getpid()
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1):
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8, key=self._hash_key).digest(), "little"
+        ) or 1
+        offset = (digest % self.slots) * self.SLOT.size
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            now = time.time()
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, self.SLOT.size, offset)
+            try:
+                owner, tokens, last = self.SLOT.unpack_from(self._map, offset)
+                if owner == 0:
+                    # never used
+                    tokens, last = burst, now
+                allowed, tokens, retry = _bucket(tokens, last, now, rate, burst, cost)
+                self.SLOT.pack_into(self._map, offset, digest, tokens, now)
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, self.SLOT.size, offset)
+        return allowed, retry
+
+
+class RedisStore:
+    """Buckets in Redis (or anything speaking its protocol), via one Lua call."""
+
+    SCRIPT = """
+    local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+    local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local tokens = tonumber(b[1]) or burst
+    local last = tonumber(b[2]) or now
+    tokens = math.min(burst, tokens + math.max(now - last, 0) * rate)
+    local allowed = 0
+    if tokens >= cost then tokens = tokens - cost; allowed = 1 end
+    redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATELIMIT_STORAGE is a redis:// URL but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1):
+        allowed, tokens = self._script(keys=[f"rl:{key}"], args=[rate, burst, cost, time.time()])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+
+# -----------------------------
+# LIMITER
+# -----------------------------
+
+def _client_ip():
+    # behind a proxy this is only the client's address with TRUSTED_PROXIES set (ProxyFix)
+    return request.remote_addr or "-"
+
+
+def _user_id():
+    claims = getattr(g, "_jwt_extended_jwt", None)
+    return claims.get("sub") if claims else None
+
+
+def _login_email():
+    # login form, or the JSON body of POST /api/v1/login
+    email = request.form.get("email")
+    if email is None and request.is_json:
+        email = (request.get_json(silent=True) or {}).get("email")
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
+
+
+KEY_FUNCS = {"ip": _client_ip, "user": _user_id, "email": _login_email}
+
+
+class RateLimiter:
+    def __init__(self):
+        self.store = None
+        self.enabled = True
+        self._limits = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RATELIMIT_ENABLED", True)
+        storage = app.config.get("RATELIMIT_STORAGE", "memory")
+        if storage == "memory":
+            self.store = MemoryStore()
+        elif storage == "shm":
+            self.store = SharedMemoryStore(
+                app.config["RATELIMIT_SHM_PATH"],
+                app.config.get("RATELIMIT_SHM_SLOTS", 65536),
+                app.config.get("RATELIMIT_HASH_KEY") or app.config["JWT_SECRET_KEY"],
+            )
+        elif storage.startswith(("redis://", "rediss://", "unix://")):
+            self.store = RedisStore(storage)
+        else:
+            raise RuntimeError(f"unknown RATELIMIT_STORAGE {storage!r}")
+        self._limits = {
+            name: [parse_limit(s) for s in (spec or "").split(",") if s.strip()]
+            for name, spec in app.config.get("RATELIMITS", {}).items()
+        }
+        app.extensions["ratelimit"] = self
+
+    def check(self, name: str) -> None:
+        """Spend one token from every bucket configured for name, or raise 429."""
+        if not self.enabled:
+            return
+        for scope, rate, burst in self._limits.get(name, ()):
+            ident = KEY_FUNCS[scope]()
+            if ident is None:
+                continue
+            allowed, retry = self.store.take(f"{name}:{scope}:{ident}", rate, burst)
+            if not allowed:
+                raise TooManyRequests(retry_after=max(1, math.ceil(retry)))
+
+    def limit(self, name: str):
+        """Route decorator. Put it below the auth guard so "user" limits see the identity."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                self.check(name)
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _RequestTally:
+    __slots__ = ("started", "sql_count", "db_seconds", "render_seconds", "render_started", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_started = []
+        self.statements = Counter()
+
+
+class RequestMetrics:
+    """
+    Per-request SQL count, DB time, template render time and response size,
+    aggregated per endpoint in this process and exported in the Prometheus
+    text format (GET /admin/metrics).
+
+    SQL is timed with cursor events on every engine (primary and replicas);
+    render time comes from Flask's template signals. A statement that runs
+    N_PLUS_ONE_THRESHOLD or more times with the same SQL in one request is
+    logged as a likely N+1.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.server_timing = False
+        self.n_plus_one_threshold = 10
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("REQUEST_METRICS_ENABLED", self.enabled)
+        self.server_timing = app.config.get("SERVER_TIMING_HEADER", self.server_timing)
+        self.n_plus_one_threshold = app.config.get("N_PLUS_ONE_THRESHOLD", self.n_plus_one_threshold)
+        app.extensions["request_metrics"] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            for engine in current_app.extensions["sqlalchemy"].engines.values():
+                event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    # -----------------------------
+    # HOOKS
+    # -----------------------------
+
+    @staticmethod
+    def _tally():
+        return g.get("_request_tally") if has_request_context() else None
+
+    def _start(self):
+        g._request_tally = _RequestTally()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        tally = self._tally()
+        started = getattr(context, "_metrics_started", None)
+        if tally is None or started is None:
+            return
+        tally.db_seconds += time.perf_counter() - started
+        tally.sql_count += 1
+        tally.statements[statement] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        tally = self._tally()
+        if tally is not None:
+            tally.render_started.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        tally = self._tally()
+        if tally is not None and tally.render_started:
+            took = time.perf_counter() - tally.render_started.pop()
+            # an include rendered through render_template() inside another render
+            # is already part of the outer render's time
+            if not tally.render_started:
+                tally.render_seconds += took
+
+    def _finish(self, response):
+        tally = g.pop("_request_tally", None)
+        if tally is None:
+            return response
+        duration = time.perf_counter() - tally.started
+        endpoint = request.endpoint or "unmatched"
+        # streamed bodies (file downloads) have no length until they are sent
+        size = response.calculate_content_length() or 0
+
+        repeated = [(n, sql) for sql, n in tally.statements.items() if n >= self.n_plus_one_threshold]
+        for n, sql in repeated:
+            log.warning(
+                "possible N+1 in %s %s (%s): %d x %s",
+                request.method, request.path, endpoint, n, " ".join(sql.split())[:300],
+            )
+
+        self._record(endpoint, response.status_code, duration, tally, size, len(repeated))
+
+        if self.server_timing:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={tally.db_seconds * 1000:.1f};desc="{tally.sql_count} queries", '
+                f"render;dur={tally.render_seconds * 1000:.1f}, "
+                f"total;dur={duration * 1000:.1f}",
+            )
+        return response
+
+    # -----------------------------
+    # AGGREGATES
+    # -----------------------------
+
+    def _record(self, endpoint, status, duration, tally, size, n_plus_one):
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            m = self._endpoints.get(endpoint)
+            if m is None:
+                m = self._endpoints[endpoint] = {
+                    "requests": Counter(),
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "duration_sum": 0.0,
+                    "sql_statements": 0,
+                    "db_seconds": 0.0,
+                    "render_seconds": 0.0,
+                    "response_bytes": 0,
+                    "n_plus_one": 0,
+                }
+            m["requests"][status_class] += 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    m["buckets"][i] += 1
+            m["duration_sum"] += duration
+            m["sql_statements"] += tally.sql_count
+            m["db_seconds"] += tally.db_seconds
+            m["render_seconds"] += tally.render_seconds
+            m["response_bytes"] += size
+            m["n_plus_one"] += n_plus_one
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {
+                    "requests": sum(m["requests"].values()),
+                    "sql_statements": m["sql_statements"],
+                    "db_seconds": round(m["db_seconds"], 6),
+                    "render_seconds": round(m["render_seconds"], 6),
+                    "response_bytes": m["response_bytes"],
+                    "n_plus_one": m["n_plus_one"],
+                }
+                for endpoint, m in self._endpoints.items()
+            }
+
+    def prometheus(self, pool: dict = None) -> str:
+        """Prometheus text exposition (format 0.0.4) of this process's counters."""
+        with self._lock:
+            endpoints = {k: dict(v, requests=Counter(v["requests"]), buckets=list(v["buckets"]))
+                         for k, v in sorted(self._endpoints.items())}
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("app_requests_total", "counter", "Requests handled, by endpoint and status class.")
+        for ep, m in endpoints.items():
+            for status, n in sorted(m["requests"].items()):
+                lines.append(f'app_requests_total{{endpoint="{_label(ep)}",status="{status}"}} {n}')
+
+        family("app_request_duration_seconds", "histogram", "Time from before_request to after_request.")
+        for ep, m in endpoints.items():
+            label = _label(ep)
+            for bound, n in zip(DURATION_BUCKETS, m["buckets"]):
+                lines.append(f'app_request_duration_seconds_bucket{{endpoint="{label}",le="{bound}"}} {n}')
+            total = sum(m["requests"].values())
+            lines.append(f'app_request_duration_seconds_bucket{{endpoint="{label}",le="+Inf"}} {total}')
+            lines.append(f'app_request_duration_seconds_sum{{endpoint="{label}"}} {m["duration_sum"]:.6f}')
+            lines.append(f'app_request_duration_seconds_count{{endpoint="{label}"}} {total}')
+
+        for key, name, help_text in (
+            ("sql_statements", "app_sql_statements_total", "SQL statements executed."),
+            ("db_seconds", "app_db_seconds_total", "Time spent executing SQL."),
+            ("render_seconds", "app_template_render_seconds_total", "Time spent rendering templates."),
+            ("response_bytes", "app_response_bytes_total", "Response body bytes (when the length is known)."),
+            ("n_plus_one", "app_n_plus_one_total", "Statements run N_PLUS_ONE_THRESHOLD+ times in one request."),
+        ):
+            family(name, "counter", help_text)
+            for ep, m in endpoints.items():
+                value = m[key]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f'{name}{{endpoint="{_label(ep)}"}} {value}')
+
+        if pool:
+            for key in ("size", "checked_out", "idle", "overflow"):
+                if key in pool:
+                    family(f"app_db_pool_{key}", "gauge", f"Primary connection pool {key}.")
+                    lines.append(f"app_db_pool_{key} {pool[key]}")
+            if "wait_seconds_total" in pool:
+                family("app_db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection.")
+                lines.append(f"app_db_pool_wait_seconds_total {pool['wait_seconds_total']:.6f}")
+                family("app_db_pool_timeouts_total", "counter", "Checkouts that hit DB_POOL_TIMEOUT.")
+                lines.append(f"app_db_pool_timeouts_total {pool['timeouts']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,101 @@
+import re
+from sqlalchemy import func, select, union_all
+
+from .extensions import db
+from .models import BlobTextChunk, Document, EffectiveAccess
+
+# must match the config used by the documents.search_vector generated column
+TS_CONFIG = "english"
+
+MAX_TERMS = 8
+
+# shorter words only match whole lexemes: "a:*" would expand to most of the index
+MIN_PREFIX = 3
+
+# a title/description hit outranks the same words somewhere inside the file
+CONTENT_WEIGHT = 0.5
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(text: str):
+    """
+    "quarterly rep q" -> "quarterly:* & rep:* & q". Only word characters
+    reach to_tsquery, so user input can never produce a tsquery syntax
+    error. Words shorter than MIN_PREFIX are matched exactly, not as
+    prefixes. None when there is nothing to search for.
+    """
+    words = _WORD_RE.findall((text or "").lower())[:MAX_TERMS]
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" if len(w) >= MIN_PREFIX else w for w in words)
+
+
+def search_documents(text: str, user_id: int = None, limit: int = 20,
+                     include_content: bool = True) -> list:
+    """
+    [(Document, rank)] best first, matching title/description and (with
+    include_content) the extracted file text. With user_id, only projects
+    that user can read (direct or group grant).
+
+    Each branch is answered by its own GIN index (documents.search_vector,
+    blob_text_chunks.search_vector); ts_rank_cd only runs over the matches,
+    never the whole table. The access filter is a semijoin inside each
+    branch, so unreadable matches are dropped before they are ranked and
+    grouped, not after.
+    """
+    expr = prefix_tsquery(text)
+    if expr is None:
+        return []
+
+    tsquery = func.to_tsquery(TS_CONFIG, expr)
+    title_hits = (
+        select(
+            Document.id.label("doc_id"),
+            func.ts_rank_cd(Document.search_vector, tsquery).label("rank"),
+        ).where(Document.search_vector.op("@@")(tsquery))
+    )
+    content_hits = (
+        select(
+            Document.id.label("doc_id"),
+            (func.max(func.ts_rank_cd(BlobTextChunk.search_vector, tsquery)) * CONTENT_WEIGHT).label("rank"),
+        )
+        .join(BlobTextChunk, BlobTextChunk.blob_sha256 == Document.content_sha256)
+        .where(BlobTextChunk.search_vector.op("@@")(tsquery))
+        .group_by(Document.id)
+    )
+    if user_id is not None:
+        readable = Document.id.in_(
+            select(EffectiveAccess.project_id).where(
+                EffectiveAccess.user_id == user_id, EffectiveAccess.can_read.is_(True)
+            )
+        )
+        title_hits = title_hits.where(readable)
+        content_hits = content_hits.where(readable)
+    branches = [title_hits, content_hits] if include_content else [title_hits]
+    hits = union_all(*branches).subquery("hits")
+    scored = (
+        select(hits.c.doc_id, func.sum(hits.c.rank).label("rank"))
+        .group_by(hits.c.doc_id)
+        .subquery("scored")
+    )
+
+    rank = scored.c.rank
+    query = db.session.query(Document, rank).join(scored, scored.c.doc_id == Document.id)
+    return query.order_by(rank.desc(), Document.updated_at.desc(), Document.id.desc()).limit(limit).all()
+
+
+def search_json(results) -> dict:
+    return {
+        "results": [
+            {
+                "id": doc.id,
+                "title": doc.title,
+                "description": doc.description,
+                "original_filename": doc.original_filename,
+                "updated_at": doc.updated_at.isoformat() if doc.updated_at else None,
+                "rank": round(float(rank), 6),
+            }
+            for doc, rank in results
+        ]
+    }
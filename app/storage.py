@@ -0,0 +1,315 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from collections import namedtuple
+from flask import Request, current_app
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from werkzeug.utils import import_string
+
+from .extensions import db
+from .models import Blob, Document
+from .uploads import stream_to_file, CHUNK_SIZE
+
+StagedBlob = namedtuple("StagedBlob", ["sha256", "size", "tmp_path"])
+
+
+class Storage:
+    """
+    Where document bytes live. Blobs are addressed by their SHA-256, so the
+    same file uploaded to many projects is stored once. Routes go through
+    store_upload / release_blob / collect_blob below, never os.path directly.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def stage(self, stream, max_bytes=None, chunk_size: int = CHUNK_SIZE) -> StagedBlob:
+        """Copy stream somewhere temporary and hash it."""
+        raise NotImplementedError
+
+    def commit_staged(self, staged: StagedBlob) -> None:
+        """Publish a staged blob under its hash (no-op if it already exists)."""
+        raise NotImplementedError
+
+    def discard_staged(self, staged: StagedBlob) -> None:
+        raise NotImplementedError
+
+    def staging_writer(self):
+        """A StagingWriter for multipart file parts, or None to let werkzeug spool them."""
+        return None
+
+    def key(self, sha256: str) -> str:
+        """Name stored in Document.stored_filename for this blob."""
+        raise NotImplementedError
+
+    def path(self, sha256: str):
+        """Local filesystem path, or None for backends without one."""
+        return None
+
+    def open(self, sha256: str):
+        raise NotImplementedError
+
+    def exists(self, sha256: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, sha256: str) -> None:
+        raise NotImplementedError
+
+    def iter_blobs(self):
+        """Yield (sha256, mtime) for every stored blob; used by storage GC."""
+        raise NotImplementedError
+
+    def sweep_staging(self, max_age: float) -> int:
+        """Remove staged files older than max_age seconds (crashed uploads)."""
+        return 0
+
+    def iter_legacy(self):
+        """Yield (stored_filename, path) for files from before content addressing."""
+        return iter(())
+
+
+# uuid4().hex + "_" + original name: the pre-blob upload layout
+_LEGACY_NAME = re.compile(r"^[0-9a-f]{32}_")
+
+
+class LocalBlobStorage(Storage):
+    """
+    Blobs under <UPLOAD_FOLDER>/blobs/<ab>/<cd>/<sha256>.
+    Keys are relative to UPLOAD_FOLDER, so old code joining UPLOAD_FOLDER and
+    stored_filename still finds the file.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.base = app.config["UPLOAD_FOLDER"]
+        self.root = os.path.join(self.base, "blobs")
+        self.tmp_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def key(self, sha256: str) -> str:
+        return "/".join(("blobs", sha256[:2], sha256[2:4], sha256))
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.base, *self.key(sha256).split("/"))
+
+    def stage(self, stream, max_bytes=None, chunk_size: int = CHUNK_SIZE) -> StagedBlob:
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        size, sha256 = stream_to_file(stream, tmp_path, max_bytes=max_bytes, chunk_size=chunk_size)
+        return StagedBlob(sha256, size, tmp_path)
+
+    def commit_staged(self, staged: StagedBlob) -> None:
+        dest = self.path(staged.sha256)
+        if os.path.exists(dest):
+            os.remove(staged.tmp_path)
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(staged.tmp_path, dest)
+
+    def discard_staged(self, staged: StagedBlob) -> None:
+        if os.path.exists(staged.tmp_path):
+            os.remove(staged.tmp_path)
+
+    def staging_writer(self):
+        return StagingWriter(os.path.join(self.tmp_dir, uuid.uuid4().hex))
+
+    def open(self, sha256: str):
+        return open(self.path(sha256), "rb")
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path(sha256))
+
+    def delete(self, sha256: str) -> None:
+        path = self.path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def iter_blobs(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if d != ".tmp"]
+            for name in filenames:
+                if len(name) == 64:
+                    yield name, os.path.getmtime(os.path.join(dirpath, name))
+
+    def sweep_staging(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def iter_legacy(self):
+        for name in os.listdir(self.base):
+            path = os.path.join(self.base, name)
+            if _LEGACY_NAME.match(name) and os.path.isfile(path):
+                yield name, path
+
+
+def init_storage(app) -> Storage:
+    backend = import_string(app.config["STORAGE_BACKEND"])
+    app.extensions["storage"] = backend(app)
+    app.request_class = StagingRequest
+    return app.extensions["storage"]
+
+
+def get_storage() -> Storage:
+    return current_app.extensions["storage"]
+
+
+# -----------------------------
+# MULTIPART UPLOADS
+# -----------------------------
+# By default werkzeug spools every multipart file part to a temp file, and
+# store_upload() then copies it into the staging area: two full writes.
+# Views marked with @stage_file_uploads have their file parts written
+# straight into the staging area instead, hashed on the way, and publish
+# them with adopt_staged() (a rename).
+
+class StagingWriter:
+    """Writable/readable staging file that hashes and counts what is written."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w+b")
+        self._sha = hashlib.sha256()
+        self._size = 0
+
+    def write(self, data) -> int:
+        self._sha.update(data)
+        self._size += len(data)
+        return self._file.write(data)
+
+    def staged(self) -> StagedBlob:
+        self._file.close()
+        return StagedBlob(self._sha.hexdigest(), self._size, self.path)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def stage_file_uploads(fn):
+    """Mark a view whose multipart file parts should go straight to the staging area."""
+    fn.stage_file_uploads = True
+    return fn
+
+
+class StagingRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        view = current_app.view_functions.get(self.endpoint) if self.url_rule else None
+        if getattr(view, "stage_file_uploads", False):
+            writer = get_storage().staging_writer()
+            if writer is not None:
+                self.__dict__.setdefault("_staging_writers", []).append(writer)
+                return writer
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+    def close(self) -> None:
+        super().close()
+        # parts the view did not adopt (rejected request, error, extra fields)
+        for writer in self.__dict__.pop("_staging_writers", ()):
+            get_storage().discard_staged(writer.staged())
+
+
+# -----------------------------
+# REFERENCE COUNTING
+# -----------------------------
+# Uploads and garbage collection of the same hash are serialized with a
+# transaction-scoped advisory lock, so a blob is never unlinked while a
+# concurrent upload is re-referencing it.
+
+def _lock_blob(sha256: str) -> None:
+    db.session.execute(db.select(func.pg_advisory_xact_lock(func.hashtext(sha256))))
+
+
+def store_upload(stream, max_bytes=None, chunk_size: int = CHUNK_SIZE) -> StagedBlob:
+    """
+    Stage the stream, publish the blob and take a reference to it in the
+    current transaction. The caller adds the Document and commits.
+    """
+    staged = get_storage().stage(stream, max_bytes=max_bytes, chunk_size=chunk_size)
+    return adopt_staged(staged)
+
+
+def adopt_staged(staged: StagedBlob) -> StagedBlob:
+    """Publish an already staged blob and reference it in the current transaction."""
+    storage = get_storage()
+    try:
+        _lock_blob(staged.sha256)
+        storage.commit_staged(staged)
+        db.session.execute(
+            pg_insert(Blob)
+            .values(sha256=staged.sha256, size_bytes=staged.size, ref_count=1)
+            .on_conflict_do_update(
+                index_elements=[Blob.sha256],
+                set_={"ref_count": Blob.ref_count + 1},
+            )
+        )
+    except BaseException:
+        storage.discard_staged(staged)
+        db.session.rollback()
+        raise
+    return staged
+
+
+def release_blob(sha256) -> bool:
+    """
+    Drop one reference in the current transaction. Returns True when that was
+    the last one; call collect_blob() after the commit in that case.
+    """
+    if not sha256:
+        return False
+    _lock_blob(sha256)
+    remaining = db.session.execute(
+        db.update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(ref_count=Blob.ref_count - 1)
+        .returning(Blob.ref_count)
+    ).scalar()
+    if remaining is not None and remaining <= 0:
+        db.session.execute(db.delete(Blob).where(Blob.sha256 == sha256))
+        return True
+    return False
+
+
+def collect_blob(sha256: str) -> bool:
+    """Unlink the blob if nothing references it any more. Own transaction."""
+    _lock_blob(sha256)
+    still_used = db.session.execute(
+        db.select(Blob.sha256).where(Blob.sha256 == sha256)
+    ).first() is not None
+    if not still_used:
+        get_storage().delete(sha256)
+    db.session.commit()
+    return not still_used
+
+
+def sweep_legacy_files(max_age: float) -> int:
+    """
+    Remove legacy upload files the blobs migration copied into the blob store.
+    A file goes only when no document points at it any more and a blob with
+    the same content exists, so files the migration never reached are kept.
+    """
+    storage = get_storage()
+    cutoff = time.time() - max_age
+    removed = 0
+    for name, path in storage.iter_legacy():
+        if os.path.getmtime(path) >= cutoff:
+            continue
+        if db.session.query(Document.id).filter(Document.stored_filename == name).first():
+            continue
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        if storage.exists(digest) and db.session.get(Blob, digest) is not None:
+            os.remove(path)
+            removed += 1
+    db.session.rollback()
+    return removed
@@ -0,0 +1,79 @@
+"""Job handlers run by worker.py (see jobs.py)."""
+import time
+from flask import current_app
+
+from .extensions import db
+from .jobs import job_handler
+from .models import Blob, User
+from .storage import get_storage, collect_blob, sweep_legacy_files
+from .uploads import expire_sessions
+from .access_bulk import apply_bulk_access
+from .text_index import index_blob
+from .change_log import compact
+
+
+@job_handler("gc_blob")
+def gc_blob(payload):
+    return {"deleted": collect_blob(payload["sha256"])}
+
+
+@job_handler("delete_user")
+def delete_user(payload):
+    user = db.session.get(User, payload["user_id"])
+    if user is None:
+        return {"deleted": False}
+    # grants, group memberships and effective access go via FK cascade; the
+    # request already deactivated the user, web processes see the rest via the change log
+    db.session.delete(user)
+    db.session.commit()
+    return {"deleted": True}
+
+
+@job_handler("bulk_access")
+def bulk_access(payload):
+    return apply_bulk_access(payload["rows"])["summary"]
+
+
+@job_handler("gc_storage")
+def gc_storage(payload):
+    """
+    Unlink blobs with no row in `blobs` (e.g. left behind by a failed upload
+    transaction), legacy upload files already copied into the blob store, and
+    expire stale staging files / resumable sessions.
+    Fresh files are skipped so in-flight uploads are never touched.
+    """
+    grace = current_app.config["STORAGE_GC_GRACE"]
+    storage = get_storage()
+    cutoff = time.time() - grace
+
+    candidates = [sha for sha, mtime in storage.iter_blobs() if mtime < cutoff]
+    deleted = 0
+    for start in range(0, len(candidates), 1000):
+        chunk = candidates[start:start + 1000]
+        known = {
+            sha for (sha,) in db.session.query(Blob.sha256).filter(Blob.sha256.in_(chunk))
+        }
+        db.session.rollback()
+        for sha in chunk:
+            if sha not in known and collect_blob(sha):
+                deleted += 1
+
+    return {
+        "orphan_blobs": deleted,
+        "staging_files": storage.sweep_staging(grace),
+        "legacy_files": sweep_legacy_files(grace),
+        "upload_sessions": expire_sessions(
+            current_app.config["UPLOAD_FOLDER"], current_app.config["UPLOAD_SESSION_TTL"]
+        ),
+    }
+
+
+@job_handler("extract_text")
+def extract_text(payload):
+    # result carries bytes/chunks/seconds, so the jobs table doubles as a throughput log
+    return index_blob(payload["sha256"], payload.get("mime_type"), payload.get("filename"))
+
+
+@job_handler("compact_change_log")
+def compact_change_log(payload):
+    return compact(current_app.config["CHANGE_LOG_COMPACT_AFTER"])
@@ -0,0 +1,214 @@
+"""
+Full-text indexing of uploaded file contents.
+
+Text is indexed per blob (content hash), not per document: projects that
+share a file share its chunks, and an upload whose content is already
+indexed costs nothing. Extraction runs in the job worker (extract_text job),
+inside a process pool, so parsing never runs in a web worker and a slow PDF
+does not hold the worker's GIL.
+"""
+import codecs
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import iterparse
+
+import click
+from flask import current_app
+from sqlalchemy import func
+
+from .extensions import db
+from .models import Blob, BlobTextChunk, Document
+from .storage import get_storage
+
+READ_CHUNK = 64 * 1024
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_pool = None
+
+
+# -----------------------------
+# EXTRACTION (runs in the process pool: plain functions, no app context)
+# -----------------------------
+
+def _kind(mime_type: str, filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    mime_type = (mime_type or "").lower()
+    if mime_type == "application/pdf" or ext == ".pdf":
+        return "pdf"
+    if "wordprocessingml" in mime_type or ext == ".docx":
+        return "docx"
+    if mime_type.startswith("text/") or ext in (".txt", ".md", ".csv", ".log", ".json", ".xml", ".html"):
+        return "text"
+    return None
+
+
+def _iter_text(path: str, kind: str):
+    """Yield text pieces without loading the whole file into memory."""
+    if kind == "text":
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(path, "rb") as f:
+            while True:
+                raw = f.read(READ_CHUNK)
+                if not raw:
+                    break
+                yield decoder.decode(raw)
+        yield decoder.decode(b"", final=True)
+
+    elif kind == "docx":
+        with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+            for event, el in iterparse(xml, events=("end",)):
+                if el.tag == _W_NS + "t" and el.text:
+                    yield el.text
+                elif el.tag == _W_NS + "p":
+                    yield "\n"
+                    el.clear()
+
+    elif kind == "pdf":
+        from pypdf import PdfReader  # optional; without it PDFs are marked unsupported
+
+        for page in PdfReader(path).pages:
+            yield (page.extract_text() or "") + "\n"
+
+
+def extract_chunks(path: str, kind: str, chunk_chars: int, max_chars: int) -> list:
+    """Split the file's text into ~chunk_chars pieces, cut at whitespace."""
+    chunks, buf, total = [], "", 0
+    for piece in _iter_text(path, kind):
+        buf += piece
+        while len(buf) >= chunk_chars:
+            cut = buf.rfind(" ", chunk_chars // 2, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            chunks.append(buf[:cut].replace("\x00", " "))
+            total += cut
+            buf = buf[cut:].lstrip()
+            if total >= max_chars:
+                return chunks
+    if buf.strip():
+        chunks.append(buf.replace("\x00", " "))
+    return chunks
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=current_app.config["TEXT_EXTRACT_WORKERS"])
+    return _pool
+
+
+# -----------------------------
+# INDEXING
+# -----------------------------
+
+def request_text_index(sha256: str, mime_type: str, filename: str) -> bool:
+    """
+    Queue extraction for a blob unless it is already indexed or queued.
+    Runs in the caller's transaction, like enqueue().
+    """
+    from .jobs import enqueue
+
+    if _kind(mime_type, filename) is None:
+        return False
+    claimed = db.session.execute(
+        db.update(Blob)
+        .where(Blob.sha256 == sha256, Blob.text_status.is_(None))
+        .values(text_status="pending")
+        .returning(Blob.sha256)
+    ).first()
+    if claimed is None:
+        return False
+    enqueue("extract_text", {"sha256": sha256, "mime_type": mime_type, "filename": filename})
+    return True
+
+
+def index_blob(sha256: str, mime_type: str, filename: str) -> dict:
+    """Extract, chunk and store the text for one blob. Own transaction."""
+    cfg = current_app.config
+    kind = _kind(mime_type, filename)
+    path = get_storage().path(sha256)
+    if kind is None or path is None or not os.path.exists(path):
+        return _finish(sha256, "unsupported", [])
+
+    started = time.monotonic()
+    try:
+        chunks = _executor().submit(
+            extract_chunks, path, kind, cfg["TEXT_CHUNK_CHARS"], cfg["TEXT_EXTRACT_MAX_CHARS"]
+        ).result()
+    except ImportError:
+        return _finish(sha256, "unsupported", [])
+    except Exception:
+        _finish(sha256, "failed", [])
+        raise
+    extract_seconds = time.monotonic() - started
+
+    result = _finish(sha256, "done", chunks)
+    result.update(
+        kind=kind,
+        bytes=os.path.getsize(path),
+        extract_seconds=round(extract_seconds, 3),
+        seconds=round(time.monotonic() - started, 3),
+    )
+    return result
+
+
+def _finish(sha256: str, status: str, chunks: list) -> dict:
+    db.session.execute(db.delete(BlobTextChunk).where(BlobTextChunk.blob_sha256 == sha256))
+    for start in range(0, len(chunks), 500):
+        db.session.execute(
+            db.insert(BlobTextChunk),
+            [
+                {"blob_sha256": sha256, "chunk_no": start + i, "content": text}
+                for i, text in enumerate(chunks[start:start + 500])
+            ],
+        )
+    db.session.execute(
+        db.update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(text_status=status, text_indexed_at=func.now())
+    )
+    db.session.commit()
+    return {"status": status, "chunks": len(chunks), "chars": sum(len(c) for c in chunks)}
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+def init_text_index(app):
+    @app.cli.command("reindex-text")
+    @click.option("--all", "reindex_all", is_flag=True, help="Re-extract blobs that are already indexed.")
+    @click.option("--inline", is_flag=True, help="Index here instead of queueing extract_text jobs.")
+    def reindex_text(reindex_all, inline):
+        """Queue (or run) text extraction for stored blobs and report throughput."""
+        query = (
+            db.session.query(Blob.sha256, Document.mime_type, Document.original_filename, Blob.size_bytes)
+            .join(Document, Document.content_sha256 == Blob.sha256)
+            .distinct(Blob.sha256)
+            .order_by(Blob.sha256)
+        )
+        if not reindex_all:
+            query = query.filter(Blob.text_status.is_(None))
+        rows = query.all()
+
+        if not inline:
+            db.session.execute(
+                db.update(Blob).where(Blob.sha256.in_([r[0] for r in rows])).values(text_status=None)
+            )
+            queued = sum(request_text_index(sha, mime, name) for sha, mime, name, _ in rows)
+            db.session.commit()
+            click.echo(f"queued {queued} extract_text jobs")
+            return
+
+        started = time.monotonic()
+        total_bytes = total_chunks = 0
+        for sha, mime, name, size in rows:
+            result = index_blob(sha, mime, name)
+            total_bytes += size if result["status"] == "done" else 0
+            total_chunks += result["chunks"]
+        took = max(time.monotonic() - started, 1e-9)
+        click.echo(
+            f"indexed {len(rows)} blobs, {total_chunks} chunks, {total_bytes / 1e6:.1f} MB "
+            f"in {took:.1f}s ({len(rows) / took:.1f} blobs/s, {total_bytes / 1e6 / took:.2f} MB/s)"
+        )
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    In-process LRU of encoded JWT -> (claims, header) for tokens whose
+    signature has already been verified.
+
+    The encoded token is the key, so a hit means this exact string (header,
+    payload and signature) passed verification before; a tampered token is a
+    different key. Entries expire with the token's own `exp`, never later.
+    """
+
+    def __init__(self, max_size: int = 4096, leeway: float = 0):
+        self.max_size = max_size
+        self.leeway = leeway
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_size = app.config.get("JWT_VERIFY_CACHE_SIZE", self.max_size)
+        self.leeway = app.config.get("JWT_DECODE_LEEWAY", self.leeway)
+        app.extensions["token_cache"] = self
+
+    def get(self, encoded: str):
+        with self._lock:
+            entry = self._entries.get(encoded)
+            if entry is not None:
+                expires_at, claims, header = entry
+                if expires_at is None or expires_at + self.leeway > time.time():
+                    self._entries.move_to_end(encoded)
+                    self.hits += 1
+                    return claims, header
+                del self._entries[encoded]
+            self.misses += 1
+            return None
+
+    def put(self, encoded: str, claims: dict, header: dict) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[encoded] = (claims.get("exp"), claims, header)
+            self._entries.move_to_end(encoded)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from werkzeug.exceptions import RequestEntityTooLarge, NotFound, BadRequest
+
+CHUNK_SIZE = 1024 * 1024
+
+_UPLOAD_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def stream_to_file(stream, dest_path: str, max_bytes=None, chunk_size: int = CHUNK_SIZE):
+    """
+    Copy a file-like stream to dest_path in fixed-size chunks, hashing as we go.
+    Writes to a sibling temp file and renames, so a failed or oversized upload
+    never leaves a half-written file at dest_path.
+    Returns (size_bytes, sha256_hex).
+    """
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+    sha = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise RequestEntityTooLarge()
+                sha.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size, sha.hexdigest()
+
+
+class ChainedReader:
+    """read()-able view over several files opened one after another."""
+
+    def __init__(self, paths):
+        self._paths = list(paths)
+        self._current = None
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return b""
+                self._current = open(self._paths.pop(0), "rb")
+            chunk = self._current.read(size)
+            if chunk:
+                return chunk
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+# -----------------------------
+# RESUMABLE (multi-part) UPLOADS
+# -----------------------------
+# Layout: <UPLOAD_FOLDER>/.incoming/<upload_id>/meta.json + part-00001, part-00002, ...
+
+def _incoming_root(upload_folder: str) -> str:
+    return os.path.join(upload_folder, ".incoming")
+
+
+def _session_dir(upload_folder: str, upload_id: str) -> str:
+    if not _UPLOAD_ID_RE.fullmatch(upload_id or ""):
+        raise NotFound()
+    path = os.path.join(_incoming_root(upload_folder), upload_id)
+    if not os.path.isdir(path):
+        raise NotFound()
+    return path
+
+
+def _part_path(session_dir: str, part_no: int) -> str:
+    return os.path.join(session_dir, f"part-{part_no:05d}")
+
+
+def init_session(upload_folder: str, owner_id: int, meta: dict) -> str:
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(_incoming_root(upload_folder), upload_id)
+    os.makedirs(path)
+    meta = dict(meta, owner_id=owner_id, created_at=time.time())
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return upload_id
+
+
+def load_session(upload_folder: str, upload_id: str, owner_id: int) -> dict:
+    path = _session_dir(upload_folder, upload_id)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    # sessions are private to the admin who opened them
+    if meta.get("owner_id") != owner_id:
+        raise NotFound()
+    return meta
+
+
+def list_parts(upload_folder: str, upload_id: str) -> dict:
+    path = _session_dir(upload_folder, upload_id)
+    parts = {}
+    for name in os.listdir(path):
+        if name.startswith("part-") and not name.endswith(".tmp"):
+            parts[int(name[5:])] = os.path.getsize(os.path.join(path, name))
+    return parts
+
+
+def write_part(upload_folder: str, upload_id: str, part_no: int, stream,
+               max_bytes=None, expected_sha256=None, chunk_size: int = CHUNK_SIZE):
+    """Store (or overwrite) one part. Re-sending a part is always safe."""
+    if part_no < 1 or part_no > 99999:
+        raise BadRequest("part number must be 1..99999")
+    path = _session_dir(upload_folder, upload_id)
+    dest = _part_path(path, part_no)
+    size, digest = stream_to_file(stream, dest, max_bytes=max_bytes, chunk_size=chunk_size)
+    if expected_sha256 and expected_sha256.lower() != digest:
+        os.remove(dest)
+        raise BadRequest("part checksum mismatch")
+    return size, digest
+
+
+def open_assembled(upload_folder: str, upload_id: str) -> ChainedReader:
+    """
+    Reader over parts 1..N (must be contiguous) in order, to be streamed into
+    storage. Caller closes it.
+    """
+    path = _session_dir(upload_folder, upload_id)
+    parts = list_parts(upload_folder, upload_id)
+    if not parts:
+        raise BadRequest("no parts uploaded")
+    missing = [n for n in range(1, max(parts) + 1) if n not in parts]
+    if missing:
+        raise BadRequest(f"missing parts: {missing[:20]}")
+
+    return ChainedReader(_part_path(path, n) for n in sorted(parts))
+
+
+def discard_session(upload_folder: str, upload_id: str) -> None:
+    shutil.rmtree(_session_dir(upload_folder, upload_id), ignore_errors=True)
+
+
+def expire_sessions(upload_folder: str, max_age: float) -> int:
+    """Drop resumable sessions nobody has touched for max_age seconds."""
+    root = _incoming_root(upload_folder)
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for upload_id in os.listdir(root):
+        path = os.path.join(root, upload_id)
+        if os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -1,65 +1,147 @@
-import os
+import hashlib
+from functools import lru_cache
 from flask import (
-    render_template,
     current_app,
-    send_file,
+    render_template,
+    make_response,
     abort,
     request,
+    session,
     redirect,
     url_for,
     flash,
+    jsonify,
 )
-from flask_jwt_extended import (
-    get_jwt,
-    get_jwt_identity,
-    verify_jwt_in_request,
-)
-from ..extensions import db
-from ..models import Document, ProjectAccess
-from ..auth.guards import login_required
+from flask_jwt_extended import get_jwt_identity
+from markupsafe import Markup
+from ..extensions import db, perm_cache, fragment_cache, limiter
+from ..models import Document, EffectiveAccess
+from ..perm_cache import Perm
+from ..storage import release_blob
+from ..effective_access import project_perm, users_with_access
+from ..jobs import enqueue
+from ..delivery import send_document
+from ..search import search_documents, search_json
+from ..auth.guards import login_required, read_only
+from ..auth.tokens import verify_request_token, request_csrf_token
 from . import user_bp
 
 
 def _require_user_role():
-    verify_jwt_in_request()
-    if get_jwt().get("role") != "user":
+    if verify_request_token().get("role") != "user":
         abort(403)
 
 
-def _get_perm_or_403(doc_id: int) -> ProjectAccess:
-    user_id = int(get_jwt_identity())
-    perm = ProjectAccess.query.filter_by(project_id=doc_id, user_id=user_id).first()
-    if not perm or not perm.can_read:
+def _get_perm_or_403(doc_id: int) -> Perm:
+    perm = project_perm(int(get_jwt_identity()), doc_id)
+    if not perm.can_read:
         abort(403)
     return perm
 
 
+# everything a row of the home page shows, with the viewer's permissions
+HOME_COLUMNS = (
+    Document.id,
+    Document.title,
+    Document.description,
+    Document.original_filename,
+    Document.updated_at,
+    EffectiveAccess.can_edit,
+    EffectiveAccess.can_delete,
+)
+HOME_TEMPLATES = ("base.html", "user_home.html", "_user_home_item.html")
+
+
+def _readable_projects(user_id: int):
+    # ✅ only projects this user can read (direct or through a group)
+    return (
+        db.session.query(*HOME_COLUMNS)
+        .select_from(Document)
+        .join(EffectiveAccess, EffectiveAccess.project_id == Document.id)
+        .filter(EffectiveAccess.user_id == user_id, EffectiveAccess.can_read.is_(True))
+    )
+
+
+@lru_cache(maxsize=1)
+def _templates_digest() -> str:
+    # part of the ETag, so a deploy that changes the markup isn't answered with 304
+    env = current_app.jinja_env
+    h = hashlib.sha256()
+    for name in HOME_TEMPLATES:
+        h.update(env.loader.get_source(env, name)[0].encode("utf-8"))
+    return h.hexdigest()
+
+
+def _home_etag(user_id: int, csrf, q: str, rows) -> str:
+    h = hashlib.sha256(_templates_digest().encode())
+    h.update(repr((user_id, csrf, q)).encode("utf-8"))
+    for r in rows:
+        h.update(repr((r.id, r.updated_at, r.can_edit, r.can_delete)).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def _home_item(row, csrf) -> Markup:
+    # the csrf token only appears in the delete form; rows without it are shared by all viewers
+    key = ("user_home", row.id, row.updated_at, row.can_edit, row.can_delete,
+           csrf if row.can_delete else None)
+    return Markup(fragment_cache.get_or_render(
+        key, lambda: render_template("_user_home_item.html", d=row)
+    ))
+
+
 @user_bp.get("/")
 @login_required
+@read_only
 def home():
     _require_user_role()
     user_id = int(get_jwt_identity())
-
-    # ✅ only projects this user can read
-    docs = (
-        Document.query
-        .join(ProjectAccess, ProjectAccess.project_id == Document.id)
-        .filter(ProjectAccess.user_id == user_id, ProjectAccess.can_read.is_(True))
-        .order_by(Document.updated_at.desc())
-        .all()
-    )
-    perms = ProjectAccess.query.filter_by(user_id=user_id).all()
-    perm_map = {p.project_id: p for p in perms}
-
-    return render_template(
-        "user_home.html",
-        docs=docs,
-        perm_map=perm_map
+    q = (request.args.get("q") or "").strip()
+
+    if q:
+        ids = [doc.id for doc, _ in search_documents(q, user_id=user_id, limit=50)]
+        found = {r.id: r for r in _readable_projects(user_id).filter(Document.id.in_(ids))} if ids else {}
+        rows = [found[i] for i in ids if i in found]
+    else:
+        rows = (
+            _readable_projects(user_id)
+            .order_by(Document.updated_at.desc(), Document.id.desc())
+            .all()
+        )
+
+    csrf = request_csrf_token()
+    etag = _home_etag(user_id, csrf, q, rows)
+    # a pending flash message is part of the page (and must be consumed)
+    if "_flashes" not in session and request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = make_response(render_template(
+            "user_home.html",
+            items=[_home_item(r, csrf) for r in rows],
+            q=q,
+        ))
+    resp.set_etag(etag)
+    # private: per user; no-cache: revalidate every visit, which is a 304 when nothing changed
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
+
+
+@user_bp.get("/search")
+@login_required
+@read_only
+def search():
+    _require_user_role()
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    results = search_documents(
+        request.args.get("q", ""), user_id=int(get_jwt_identity()), limit=limit
     )
+    return jsonify(search_json(results))
 
 
 @user_bp.get("/doc/<int:doc_id>/download")
 @login_required
+@read_only
+@limiter.limit("download")
 def download(doc_id: int):
     _require_user_role()
 
@@ -67,15 +149,7 @@ def download(doc_id: int):
     _get_perm_or_403(doc_id)
 
     doc = Document.query.get_or_404(doc_id)
-    file_path = os.path.join(current_app.config["UPLOAD_FOLDER"], doc.stored_filename)
-    if not os.path.exists(file_path):
-        abort(404)
-
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=doc.original_filename,
-    )
+    return send_document(doc)
 
 
 # -----------------------------
@@ -130,15 +204,16 @@ def delete_doc(doc_id: int):
         abort(403)
 
     doc = Document.query.get_or_404(doc_id)
+    affected_user_ids = users_with_access(doc_id)
 
-    # remove file from disk
-    file_path = os.path.join(current_app.config["UPLOAD_FOLDER"], doc.stored_filename)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    # the file is only unlinked (by the job worker) once no other project shares it
+    if release_blob(doc.content_sha256):
+        enqueue("gc_blob", {"sha256": doc.content_sha256})
 
     # delete the project itself (ProjectAccess rows should be removed via FK cascade)
     db.session.delete(doc)
     db.session.commit()
+    perm_cache.bump_user(*affected_user_ids)
 
     flash("Project deleted.", "success")
     return redirect(url_for("user.home"))
@@ -0,0 +1,7 @@
+# ASGI entry point, for transfer-heavy deployments:
+#   pip install uvicorn
+#   uvicorn asgi:app --workers 2 --port 8000
+from app import create_app
+from app.asgi import ASGIAdapter
+
+app = ASGIAdapter(create_app())
@@ -0,0 +1,14 @@
+"""
+Benchmarks. Run from the repository root against a throwaway database:
+
+    python -m bench.seed --users 2000 --documents 500 --sizes 16K,256K,4M --density 0.02
+    python -m bench.run dashboard --concurrency 8 --duration 30 --save-baseline
+    python -m bench.run dashboard --concurrency 8 --duration 30   # compares with the baseline
+    python bench/importtime.py                                    # cold start only
+
+Seeded accounts share BENCH_PASSWORD and live under the bench.local domain.
+"""
+BENCH_PASSWORD = "bench-password"
+ADMIN_EMAIL = "bench-admin@bench.local"
+USER_EMAIL = "bench-user-{}@bench.local"
+EMAIL_DOMAIN = "@bench.local"
@@ -0,0 +1,65 @@
+"""Minimal cookie-keeping HTTP client; no redirects are followed, so every request is timed on its own."""
+import http.client
+import re
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+READ_CHUNK = 64 * 1024
+
+_SQL_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class Session:
+    def __init__(self, base_url: str):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.cookies = {}
+        self._conn = None
+
+    def request(self, method: str, path: str, form: dict = None) -> tuple:
+        """(status, seconds, sql statements or None, body bytes); the body is read and dropped."""
+        headers = {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+        started = time.perf_counter()
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+            resp = self._conn.getresponse()
+            size = 0
+            while True:
+                chunk = resp.read(READ_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        elapsed = time.perf_counter() - started
+
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel.value and morsel["max-age"] not in ("0", 0):
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+        if resp.will_close:
+            self.close()
+
+        m = _SQL_RE.search(resp.headers.get("Server-Timing") or "")
+        return resp.status, elapsed, int(m.group(1)) if m else None, size
+
+    def csrf(self) -> str:
+        return self.cookies.get("csrf_access_token", "")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,104 @@
+"""
+Cold-start benchmark for create_app().
+
+Each run is a fresh interpreter, so nothing is cached in sys.modules:
+
+    python bench/importtime.py                      # full app, 5 runs
+    python bench/importtime.py --blueprints ""      # worker/CLI profile
+    python bench/importtime.py --lazy --max-ms 400  # exit 1 if the median is slower
+
+No database is contacted: DB_POOL_PREWARM=0 and a placeholder DATABASE_URL
+are used unless you set them.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SNIPPET = """
+import time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+create_app()
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f}")
+"""
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env(args) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "postgresql+psycopg://bench@localhost/bench")
+    env.setdefault("JWT_SECRET_KEY", "bench-" + "x" * 32)
+    env["DB_POOL_PREWARM"] = "0"
+    env["BOOTSTRAP_ON_STARTUP"] = "0"
+    if args.blueprints is not None:
+        env["APP_BLUEPRINTS"] = args.blueprints
+    env["APP_LAZY_BLUEPRINTS"] = "1" if args.lazy else "0"
+    return env
+
+
+def run_once(env) -> tuple:
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if out.returncode:
+        sys.exit(f"create_app() failed:\n{out.stderr}")
+    import_ms, factory_ms = map(float, out.stdout.split()[-2:])
+    return import_ms, factory_ms
+
+
+def top_imports(env, top: int) -> list:
+    """Slowest top-level imports by cumulative time, from python -X importtime."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app()"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        m = _LINE.match(line)
+        # top level (the -c line) and whatever those import directly
+        if m and len(m.group(3)) <= 3:
+            rows.append((int(m.group(2)) / 1000, m.group(4)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--blueprints", default=None, help="APP_BLUEPRINTS for the run (\"\" = none)")
+    parser.add_argument("--lazy", action="store_true", help="APP_LAZY_BLUEPRINTS=1")
+    parser.add_argument("--top", type=int, default=10, help="show the N slowest imports")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if median total exceeds this")
+    args = parser.parse_args()
+
+    env = _env(args)
+    run_once(env)  # warm the filesystem cache and .pyc files
+    runs = [run_once(env) for _ in range(args.runs)]
+    totals = [a + b for a, b in runs]
+    median = statistics.median(totals)
+
+    print(f"create_app() cold start over {args.runs} runs "
+          f"(blueprints={env.get('APP_BLUEPRINTS', 'default')!r}, lazy={args.lazy})")
+    print(f"  import app     median {statistics.median(a for a, _ in runs):8.1f} ms")
+    print(f"  create_app()   median {statistics.median(b for _, b in runs):8.1f} ms")
+    print(f"  total          median {median:8.1f} ms   min {min(totals):.1f}   max {max(totals):.1f}")
+    if args.top:
+        print("slowest imports (cumulative):")
+        for ms, name in top_imports(env, args.top):
+            print(f"  {ms:8.1f} ms  {name}")
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"FAIL: median {median:.1f} ms > --max-ms {args.max_ms}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Run a load scenario against the app and report latency, throughput and SQL
+statements per endpoint.
+
+    python -m bench.run dashboard --concurrency 8 --duration 30
+    python -m bench.run download_fanout --save-baseline
+    python -m bench.run grant_churn --max-regression 15   # exit 1 if p95 got >15% worse
+
+By default the app is served in this process by a threaded werkzeug server
+on a free local port; --url points the load at a server you started yourself
+(gunicorn, ...) on the same database instead. Run `python -m bench.seed` first.
+SQL counts come from the Server-Timing header, so the target needs
+SERVER_TIMING_HEADER=1 (set automatically for the in-process server).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from . import BENCH_PASSWORD, EMAIL_DOMAIN
+from .client import Session
+from .scenarios import SCENARIOS
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+MAX_READABLE_PER_USER = 200
+
+
+class Worker:
+    def __init__(self, index: int, seed: int):
+        self.index = index
+        self.rng = random.Random(seed * 1000 + index)
+        self.samples = defaultdict(list)
+        self.recording = False
+
+    def call(self, session, label, method, path, form=None, expect=(200,)):
+        try:
+            status, seconds, sql, _ = session.request(method, path, form)
+        except OSError:
+            status, seconds, sql = 0, 0.0, None
+        if self.recording:
+            self.samples[label].append((seconds, sql, status in expect))
+        return status
+
+
+class Bench:
+    def __init__(self, base_url: str, fixtures: dict):
+        self.base_url = base_url
+        self.fixtures = fixtures
+
+    def login(self, email: str) -> Session:
+        session = Session(self.base_url)
+        status = session.request("POST", "/login", {"email": email, "password": BENCH_PASSWORD})[0]
+        if status != 302 or "access_token_cookie" not in session.cookies:
+            raise SystemExit(f"login as {email} failed (HTTP {status}); run `python -m bench.seed` first")
+        return session
+
+
+def load_fixtures(app) -> dict:
+    from app.extensions import db
+    from app.models import Document, EffectiveAccess, User
+
+    with app.app_context():
+        users = (
+            db.session.query(User.id, User.email)
+            .filter(User.role == "user", User.email.like(f"%{EMAIL_DOMAIN}"))
+            .all()
+        )
+        readable = defaultdict(list)
+        rows = (
+            db.session.query(User.email, EffectiveAccess.project_id)
+            .join(EffectiveAccess, EffectiveAccess.user_id == User.id)
+            .filter(User.role == "user", User.email.like(f"%{EMAIL_DOMAIN}"), EffectiveAccess.can_read.is_(True))
+        )
+        for email, project_id in rows.yield_per(5000):
+            if len(readable[email]) < MAX_READABLE_PER_USER:
+                readable[email].append(project_id)
+        fixtures = {
+            "user_ids": [u.id for u in users],
+            "user_emails": [u.email for u in users],
+            "doc_ids": [d for (d,) in db.session.query(Document.id)],
+            "readable": dict(readable),
+        }
+        db.session.remove()
+    if not fixtures["user_ids"] or not fixtures["doc_ids"]:
+        raise SystemExit("no bench users/documents in this database; run `python -m bench.seed` first")
+    return fixtures
+
+
+def serve(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run(scenario, concurrency: int, duration: float, warmup: float, seed: int) -> tuple:
+    workers = [Worker(i, seed) for i in range(concurrency)]
+    for w in workers:
+        scenario.setup(w)
+
+    started = time.monotonic()
+    record_from = started + warmup
+    stop_at = record_from + duration
+
+    def loop(worker):
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            worker.recording = now >= record_from
+            scenario.step(worker)
+
+    threads = [threading.Thread(target=loop, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - record_from
+
+    samples = defaultdict(list)
+    for w in workers:
+        for label, rows in w.samples.items():
+            samples[label].extend(rows)
+    return samples, elapsed
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    # nearest rank
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    report = {}
+    for label, rows in sorted(samples.items()):
+        latencies = sorted(s for s, _, _ in rows)
+        sql = [q for _, q, _ in rows if q is not None]
+        report[label] = {
+            "count": len(rows),
+            "errors": sum(1 for _, _, ok in rows if not ok),
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "rps": round(len(rows) / elapsed, 2),
+            "sql_per_request": round(sum(sql) / len(sql), 2) if sql else None,
+        }
+    return report
+
+
+def _delta(new, old) -> str:
+    if new is None or not old:
+        return ""
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def print_report(report: dict, baseline: dict = None):
+    base = (baseline or {}).get("endpoints", {})
+    print(f"{'endpoint':34} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>8} {'sql/req':>8}" + ("   vs baseline (p95, req/s, sql)" if base else ""))
+    for label, r in report.items():
+        line = (f"{label:34} {r['count']:7d} {r['errors']:5d} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} "
+                f"{r['p99_ms']:9.1f} {r['rps']:8.1f} {r['sql_per_request'] if r['sql_per_request'] is not None else '-':>8}")
+        old = base.get(label)
+        if old:
+            line += (f"   {_delta(r['p95_ms'], old['p95_ms']):>6} {_delta(r['rps'], old['rps']):>6} "
+                     f"{_delta(r['sql_per_request'], old.get('sql_per_request')):>6}")
+        print(line)
+
+
+def regressions(report: dict, baseline: dict, max_pct: float) -> list:
+    found = []
+    for label, old in baseline.get("endpoints", {}).items():
+        new = report.get(label)
+        if not new:
+            continue
+        if old["p95_ms"] and new["p95_ms"] > old["p95_ms"] * (1 + max_pct / 100):
+            found.append(f"{label}: p95 {old['p95_ms']} -> {new['p95_ms']} ms")
+        if (old.get("sql_per_request") is not None and new["sql_per_request"] is not None
+                and new["sql_per_request"] > old["sql_per_request"]):
+            found.append(f"{label}: sql/req {old['sql_per_request']} -> {new['sql_per_request']}")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds run before measuring")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", default=None, help="target an already running server")
+    parser.add_argument("--keep-ratelimit", action="store_true",
+                        help="leave RATELIMIT_ENABLED as configured (in-process server)")
+    parser.add_argument("--baseline", default=None, help="baseline file (default bench/baselines/<scenario>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit 1 if a p95 is this many percent above the baseline, or sql/req grew")
+    args = parser.parse_args()
+
+    # Config reads the environment at import time
+    os.environ["SERVER_TIMING_HEADER"] = "1"
+    os.environ["REQUEST_METRICS_ENABLED"] = "1"
+    if not args.keep_ratelimit:
+        os.environ["RATELIMIT_ENABLED"] = "0"
+    from app import create_app
+
+    app = create_app(blueprints=() if args.url else None, lazy_blueprints=False)
+    fixtures = load_fixtures(app)
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, base_url = serve(app)
+
+    scenario = SCENARIOS[args.scenario](Bench(base_url, fixtures))
+    try:
+        samples, elapsed = run(scenario, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = summarize(samples, elapsed)
+    total = sum(r["count"] for r in report.values())
+    print(f"{args.scenario}: {args.concurrency} workers, {elapsed:.1f}s measured, "
+          f"{total} requests, {total / elapsed:.1f} req/s ({base_url})")
+
+    path = args.baseline or os.path.join(BASELINE_DIR, f"{args.scenario}.json")
+    baseline = None
+    if os.path.exists(path) and not args.save_baseline:
+        with open(path) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "scenario": args.scenario,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "endpoints": report,
+            }, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {path}")
+
+    if baseline and args.max_regression is not None:
+        found = regressions(report, baseline, args.max_regression)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
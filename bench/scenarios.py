@@ -0,0 +1,86 @@
+"""
+Load scenarios. Each one is a class whose step() runs one iteration on a
+worker thread; Worker.call() times a request under a label, and those labels
+are the rows of the report.
+"""
+from . import ADMIN_EMAIL, BENCH_PASSWORD
+from .client import Session
+
+SESSIONS_PER_WORKER = 8
+
+
+class Scenario:
+    name = None
+
+    def __init__(self, bench):
+        self.bench = bench
+
+    def setup(self, worker):
+        """Per-worker state (logged-in sessions); not timed."""
+
+    def step(self, worker):
+        raise NotImplementedError
+
+
+class LoginStorm(Scenario):
+    """Fresh sessions logging in as random users: the password KDF pool under load."""
+    name = "login_storm"
+
+    def step(self, worker):
+        email = worker.rng.choice(self.bench.fixtures["user_emails"])
+        worker.call(Session(self.bench.base_url), "auth.login_submit", "POST", "/login",
+                    form={"email": email, "password": BENCH_PASSWORD}, expect=(302,))
+
+
+class DashboardBrowsing(Scenario):
+    """The admin projects and users tabs, and a user's home page."""
+    name = "dashboard"
+
+    def setup(self, worker):
+        worker.admin = self.bench.login(ADMIN_EMAIL)
+        worker.users = [self.bench.login(worker.rng.choice(self.bench.fixtures["user_emails"]))
+                        for _ in range(SESSIONS_PER_WORKER)]
+
+    def step(self, worker):
+        worker.call(worker.admin, "admin.dashboard?tab=projects", "GET", "/admin/?tab=projects")
+        worker.call(worker.admin, "admin.dashboard?tab=users", "GET", "/admin/?tab=users")
+        worker.call(worker.rng.choice(worker.users), "user.home", "GET", "/user/")
+
+
+class DownloadFanout(Scenario):
+    """Many users downloading documents they can read."""
+    name = "download_fanout"
+
+    def setup(self, worker):
+        readable = self.bench.fixtures["readable"]
+        emails = worker.rng.sample(sorted(readable), min(SESSIONS_PER_WORKER, len(readable)))
+        worker.users = [(self.bench.login(email), readable[email]) for email in emails]
+
+    def step(self, worker):
+        session, doc_ids = worker.rng.choice(worker.users)
+        doc_id = worker.rng.choice(doc_ids)
+        worker.call(session, "user.download", "GET", f"/user/doc/{doc_id}/download")
+
+
+class GrantChurn(Scenario):
+    """Grant, widen and revoke single (project, user) pairs, as the admin UI does."""
+    name = "grant_churn"
+
+    def setup(self, worker):
+        worker.admin = self.bench.login(ADMIN_EMAIL)
+
+    def step(self, worker):
+        doc_id = worker.rng.choice(self.bench.fixtures["doc_ids"])
+        user_id = worker.rng.choice(self.bench.fixtures["user_ids"])
+        admin = worker.admin
+        base = f"/admin/projects/{doc_id}/access"
+        for label, action, extra in (
+            ("admin.grant_project_access", "grant", {}),
+            ("admin.update_project_access", "update", {"can_edit": "on"}),
+            ("admin.revoke_project_access", "revoke", {}),
+        ):
+            form = dict(extra, user_id=str(user_id), csrf_token=admin.csrf())
+            worker.call(admin, label, "POST", f"{base}/{action}", form=form, expect=(302,))
+
+
+SCENARIOS = {cls.name: cls for cls in (LoginStorm, DashboardBrowsing, DownloadFanout, GrantChurn)}
@@ -0,0 +1,125 @@
+"""
+Synthetic data for the benchmarks: N users, M documents backed by real
+files, and random direct grants at the given density.
+
+    python -m bench.seed --users 2000 --documents 500 --sizes 16K,256K,4M --density 0.02
+
+Re-running adds more documents and grants; existing bench users are kept.
+The same --seed produces the same sizes, contents and grants.
+"""
+import argparse
+import io
+import random
+import sys
+import time
+
+from . import ADMIN_EMAIL, BENCH_PASSWORD, USER_EMAIL
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+GRANT_BATCH = 5000
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1] if text and text[-1] in _UNITS else ""
+    return int(float(text[: len(text) - len(unit)]) * _UNITS[unit])
+
+
+def seed_users(count: int) -> tuple:
+    """(admin_id, [user ids]); one password hash shared by every account."""
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from app.extensions import db, password_hasher
+    from app.models import User
+
+    password_hash = password_hasher.hash(BENCH_PASSWORD)
+    rows = [{"email": ADMIN_EMAIL, "role": "admin", "can_create_projects": True}]
+    rows += [{"email": USER_EMAIL.format(i), "role": "user", "can_create_projects": False}
+             for i in range(count)]
+    for start in range(0, len(rows), GRANT_BATCH):
+        db.session.execute(
+            pg_insert(User)
+            .values([dict(r, password_hash=password_hash) for r in rows[start:start + GRANT_BATCH]])
+            .on_conflict_do_nothing(index_elements=[User.email])
+        )
+    db.session.commit()
+
+    ids = dict(db.session.query(User.email, User.id).filter(User.email.in_([r["email"] for r in rows])))
+    return ids[ADMIN_EMAIL], [ids[USER_EMAIL.format(i)] for i in range(count)]
+
+
+def seed_documents(count: int, sizes: list, admin_id: int, rng: random.Random) -> list:
+    """Each document gets its own random content, so none are deduplicated."""
+    from app.extensions import db
+    from app.models import Document
+    from app.storage import get_storage, store_upload
+
+    storage = get_storage()
+    doc_ids = []
+    for i in range(count):
+        size = sizes[i % len(sizes)]
+        blob = store_upload(io.BytesIO(rng.randbytes(size)))
+        doc = Document(
+            title=f"Bench project {i} {rng.choice(('alpha', 'beta', 'gamma', 'delta'))}",
+            description=f"synthetic document, {size} bytes",
+            stored_filename=storage.key(blob.sha256),
+            original_filename=f"bench-{i}.bin",
+            mime_type="application/octet-stream",
+            content_sha256=blob.sha256,
+            size_bytes=blob.size,
+            uploaded_by=admin_id,
+        )
+        db.session.add(doc)
+        db.session.commit()
+        doc_ids.append(doc.id)
+    return doc_ids
+
+
+def seed_grants(doc_ids: list, user_ids: list, density: float, rng: random.Random) -> int:
+    """Each user gets round(density * documents) random documents; 1 in 5 grants include edit."""
+    from app.access_bulk import apply_bulk_access, parse_json
+
+    per_user = max(0, round(len(doc_ids) * density))
+    rows = []
+    for user_id in user_ids:
+        for doc_id in rng.sample(doc_ids, min(per_user, len(doc_ids))):
+            rows.append({"action": "grant", "project_id": doc_id, "user_id": user_id,
+                         "can_edit": rng.random() < 0.2})
+    for start in range(0, len(rows), GRANT_BATCH):
+        apply_bulk_access(parse_json(rows[start:start + GRANT_BATCH]))
+    return len(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--sizes", default="16K,256K,1M", help="file sizes, cycled over the documents")
+    parser.add_argument("--density", type=float, default=0.05,
+                        help="fraction of documents each user is granted")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    rng = random.Random(args.seed)
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    app = create_app(blueprints=())
+    with app.app_context():
+        started = time.monotonic()
+        admin_id, user_ids = seed_users(args.users)
+        print(f"users: {len(user_ids)} (+ admin {ADMIN_EMAIL}), {time.monotonic() - started:.1f}s")
+
+        started = time.monotonic()
+        doc_ids = seed_documents(args.documents, sizes, admin_id, rng)
+        total = sum(sizes[i % len(sizes)] for i in range(args.documents))
+        print(f"documents: {len(doc_ids)}, {total / 1e6:.1f} MB, {time.monotonic() - started:.1f}s")
+
+        started = time.monotonic()
+        grants = seed_grants(doc_ids, user_ids, args.density, rng)
+        print(f"grants: {grants}, {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
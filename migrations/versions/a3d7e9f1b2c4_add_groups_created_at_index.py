@@ -0,0 +1,26 @@
+"""add groups created_at index
+
+Revision ID: a3d7e9f1b2c4
+Revises: f2c6d8e0a1b3
+Create Date: 2026-10-20 14:02:17.655120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7e9f1b2c4'
+down_revision = 'f2c6d8e0a1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.create_index('ix_groups_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_index('ix_groups_created_at_id')
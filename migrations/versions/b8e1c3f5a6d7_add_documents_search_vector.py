@@ -0,0 +1,38 @@
+"""add documents search vector
+
+Revision ID: b8e1c3f5a6d7
+Revises: a7d0b2e4f5c6
+Create Date: 2026-10-18 16:12:09.517304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1c3f5a6d7'
+down_revision = 'a7d0b2e4f5c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a STORED generated column rewrites the table once; Postgres fills it for existing rows
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ))
+        batch_op.create_index('ix_documents_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_documents_search_vector', postgresql_using='gin')
+        batch_op.drop_column('search_vector')
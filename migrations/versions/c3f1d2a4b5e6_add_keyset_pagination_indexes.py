@@ -0,0 +1,36 @@
+"""add keyset pagination indexes
+
+Revision ID: c3f1d2a4b5e6
+Revises: 9113a3509a15
+Create Date: 2026-10-18 09:12:04.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1d2a4b5e6'
+down_revision = '9113a3509a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keyset cursors compare (ts, id) tuples, so NULL timestamps would fall off every page
+    op.execute("UPDATE documents SET updated_at = COALESCE(uploaded_at, now()) WHERE updated_at IS NULL")
+    op.execute("UPDATE users SET created_at = now() WHERE created_at IS NULL")
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.create_index('ix_documents_updated_at_id', ['updated_at', 'id'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_created_at_id')
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_documents_updated_at_id')
@@ -0,0 +1,43 @@
+"""add blob text chunks
+
+Revision ID: c9f2d4a6b7e8
+Revises: b8e1c3f5a6d7
+Create Date: 2026-10-18 17:02:44.118530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c9f2d4a6b7e8'
+down_revision = 'b8e1c3f5a6d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('text_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('text_indexed_at', sa.DateTime(), nullable=True))
+
+    op.create_table('blob_text_chunks',
+    sa.Column('blob_sha256', sa.String(length=64), nullable=False),
+    sa.Column('chunk_no', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', content)", persisted=True), nullable=True),
+    sa.ForeignKeyConstraint(['blob_sha256'], ['blobs.sha256'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('blob_sha256', 'chunk_no')
+    )
+    with op.batch_alter_table('blob_text_chunks', schema=None) as batch_op:
+        batch_op.create_index('ix_blob_text_chunks_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    with op.batch_alter_table('blob_text_chunks', schema=None) as batch_op:
+        batch_op.drop_index('ix_blob_text_chunks_search_vector', postgresql_using='gin')
+
+    op.drop_table('blob_text_chunks')
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_column('text_indexed_at')
+        batch_op.drop_column('text_status')
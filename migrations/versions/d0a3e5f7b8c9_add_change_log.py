@@ -0,0 +1,40 @@
+"""add change log
+
+Revision ID: d0a3e5f7b8c9
+Revises: c9f2d4a6b7e8
+Create Date: 2026-10-18 19:24:07.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0a3e5f7b8c9'
+down_revision = 'c9f2d4a6b7e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('entity', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.String(length=64), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_change_log_entity', ['entity', 'entity_id', 'seq'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_entity')
+        batch_op.drop_index('ix_change_log_created_at')
+
+    op.drop_table('change_log')
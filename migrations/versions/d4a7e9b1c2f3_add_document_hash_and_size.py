@@ -0,0 +1,30 @@
+"""add document content hash and size
+
+Revision ID: d4a7e9b1c2f3
+Revises: c3f1d2a4b5e6
+Create Date: 2026-10-18 10:02:37.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7e9b1c2f3'
+down_revision = 'c3f1d2a4b5e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_content_sha256'), ['content_sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_documents_content_sha256'))
+        batch_op.drop_column('size_bytes')
+        batch_op.drop_column('content_sha256')
@@ -0,0 +1,28 @@
+"""add users is_active
+
+Revision ID: e1b5c7d9f0a2
+Revises: d0a3e5f7b8c9
+Create Date: 2026-10-19 10:12:31.402617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b5c7d9f0a2'
+down_revision = 'd0a3e5f7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.text('true'))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('is_active')
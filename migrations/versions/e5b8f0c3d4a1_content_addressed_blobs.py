@@ -0,0 +1,93 @@
+"""content addressed blobs
+
+Revision ID: e5b8f0c3d4a1
+Revises: d4a7e9b1c2f3
+Create Date: 2026-10-18 11:26:52.904417
+
+"""
+import hashlib
+import os
+import shutil
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8f0c3d4a1'
+down_revision = 'd4a7e9b1c2f3'
+branch_labels = None
+depends_on = None
+
+
+def _blob_key(sha256):
+    return "/".join(("blobs", sha256[:2], sha256[2:4], sha256))
+
+
+def upgrade():
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+
+    # Backfill: hash every legacy uuid_original.ext file, link (or copy) it
+    # into the sharded blob layout and point the row at it. The legacy file
+    # stays where it is, so a failed upgrade that rolls back still finds
+    # every file; the gc_storage job removes legacy files afterwards.
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, stored_filename FROM documents WHERE stored_filename NOT LIKE 'blobs/%'"
+    )).fetchall()
+
+    for row in rows:
+        src = os.path.join(upload_folder, row.stored_filename)
+        if not os.path.isfile(src):
+            continue
+
+        sha = hashlib.sha256()
+        size = 0
+        with open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+                size += len(chunk)
+        digest = sha.hexdigest()
+
+        key = _blob_key(digest)
+        dest = os.path.join(upload_folder, *key.split("/"))
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            try:
+                os.link(src, dest)
+            except OSError:
+                # other filesystem, or no hard links: copy, then publish atomically
+                tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+                shutil.copyfile(src, tmp)
+                os.replace(tmp, dest)
+
+        conn.execute(
+            sa.text("""
+                UPDATE documents
+                SET content_sha256 = :sha, size_bytes = :size, stored_filename = :key
+                WHERE id = :id
+            """),
+            {"sha": digest, "size": size, "key": key, "id": row.id},
+        )
+
+    conn.execute(sa.text("""
+        INSERT INTO blobs (sha256, size_bytes, ref_count)
+        SELECT content_sha256, MAX(COALESCE(size_bytes, 0)), COUNT(*)
+        FROM documents
+        WHERE content_sha256 IS NOT NULL
+        GROUP BY content_sha256
+    """))
+
+
+def downgrade():
+    # files stay in blobs/; stored_filename is still a valid path under UPLOAD_FOLDER
+    op.drop_table('blobs')
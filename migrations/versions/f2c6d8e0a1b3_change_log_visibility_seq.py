@@ -0,0 +1,49 @@
+"""change_log seq assigned after commit
+
+Revision ID: f2c6d8e0a1b3
+Revises: e1b5c7d9f0a2
+Create Date: 2026-10-20 09:41:55.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d8e0a1b3'
+down_revision = 'e1b5c7d9f0a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing entries keep their seq; the sequence behind it (still owned by
+    # the column) now hands out values in app/change_log.assign_seqs
+    op.add_column('change_log', sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False))
+    op.add_column('change_log', sa.Column(
+        'txid', sa.BigInteger(), nullable=False,
+        server_default=sa.text('pg_current_xact_id()::text::bigint'),
+    ))
+    op.drop_constraint('change_log_pkey', 'change_log', type_='primary')
+    op.create_primary_key('change_log_pkey', 'change_log', ['id'])
+    op.alter_column('change_log', 'seq', existing_type=sa.BigInteger(), nullable=True, server_default=None)
+    op.create_index('ix_change_log_seq', 'change_log', ['seq'], unique=True)
+    op.create_index(
+        'ix_change_log_unsequenced', 'change_log', ['txid', 'id'],
+        postgresql_where=sa.text('seq IS NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_change_log_unsequenced', table_name='change_log')
+    op.drop_index('ix_change_log_seq', table_name='change_log')
+    # entries that never got a seq cannot keep a place in the old feed
+    op.execute("DELETE FROM change_log WHERE seq IS NULL")
+    op.alter_column(
+        'change_log', 'seq', existing_type=sa.BigInteger(), nullable=False,
+        server_default=sa.text("nextval('change_log_seq_seq'::regclass)"),
+    )
+    op.drop_constraint('change_log_pkey', 'change_log', type_='primary')
+    op.create_primary_key('change_log_pkey', 'change_log', ['seq'])
+    op.drop_column('change_log', 'txid')
+    op.drop_column('change_log', 'id')
@@ -0,0 +1,96 @@
+"""add groups and materialized effective access
+
+Revision ID: f6c9a1d2e3b4
+Revises: e5b8f0c3d4a1
+Create Date: 2026-10-18 12:48:15.337026
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c9a1d2e3b4'
+down_revision = 'e5b8f0c3d4a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('groups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['parent_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_groups_parent_id'), ['parent_id'], unique=False)
+
+    op.create_table('group_members',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+    with op.batch_alter_table('group_members', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_group_members_user_id'), ['user_id'], unique=False)
+
+    op.create_table('group_project_access',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('can_read', sa.Boolean(), nullable=False),
+    sa.Column('can_edit', sa.Boolean(), nullable=False),
+    sa.Column('can_delete', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['project_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('project_id', 'group_id', name='uq_project_group_access')
+    )
+    with op.batch_alter_table('group_project_access', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_group_project_access_group_id'), ['group_id'], unique=False)
+
+    op.create_table('effective_access',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('can_read', sa.Boolean(), nullable=False),
+    sa.Column('can_edit', sa.Boolean(), nullable=False),
+    sa.Column('can_delete', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'project_id')
+    )
+    with op.batch_alter_table('effective_access', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_effective_access_project_id'), ['project_id'], unique=False)
+
+    # no groups exist yet, so effective access == direct access
+    op.execute("""
+        INSERT INTO effective_access (user_id, project_id, can_read, can_edit, can_delete)
+        SELECT user_id, project_id, TRUE, can_edit, can_delete
+        FROM project_access
+        WHERE can_read OR can_edit OR can_delete
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('effective_access', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_effective_access_project_id'))
+    op.drop_table('effective_access')
+
+    with op.batch_alter_table('group_project_access', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_group_project_access_group_id'))
+    op.drop_table('group_project_access')
+
+    with op.batch_alter_table('group_members', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_group_members_user_id'))
+    op.drop_table('group_members')
+
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_groups_parent_id'))
+    op.drop_table('groups')
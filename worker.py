@@ -0,0 +1,16 @@
+import argparse
+import logging
+
+from app import create_app
+from app.jobs import run_worker
+
+app = create_app(blueprints=())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs from the jobs table.")
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    parser.add_argument("--poll", type=float, default=None, help="seconds between empty polls")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run_worker(app, poll_interval=args.poll, once=args.once)